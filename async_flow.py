@@ -8,6 +8,7 @@
 
 import asyncio
 import logging
+from functools import lru_cache
 from typing import Dict, Any, Optional, List
 from pocketflow import AsyncFlow, AsyncParallelBatchFlow
 
@@ -17,6 +18,9 @@ from async_nodes import (
     AsyncAnalyzeDocumentNode,
     AsyncDesignLayoutNode,
     AsyncProcessTextNode,
+    AsyncOptimizeContentNode,
+    AsyncConcurrentNode,
+    AsyncDAGNode,
     ParallelImageProcessingNode,
     AsyncGenerateDocumentNode
 )
@@ -42,6 +46,14 @@ class DocumentProcessingAsyncFlow(AsyncFlow):
         self.process_text = AsyncProcessTextNode(
             max_retries=2, wait=1
         )
+        self.optimize_content = AsyncOptimizeContentNode(
+            max_retries=2, wait=1
+        )
+        # 内容优化不依赖排版方案，与排版设计并发执行
+        self.design_and_optimize = AsyncConcurrentNode([
+            self.design_layout,
+            self.optimize_content
+        ])
         self.unify_images = ParallelImageProcessingNode(
             max_retries=2, wait=1
         )
@@ -50,20 +62,32 @@ class DocumentProcessingAsyncFlow(AsyncFlow):
         )
         
         # 根据策略构建不同的工作流
-        self._build_workflow()
+        start_node = self._build_workflow()
         
         # 初始化父类
-        super().__init__(start=self.parse_requirement)
+        super().__init__(start=start_node)
+    
+    def _build_complete_dag(self):
+        """完整流程的依赖图：只保留真实的数据依赖，其余节点并发执行"""
+        return AsyncDAGNode({
+            self.parse_requirement: [],
+            self.analyze_document: [self.parse_requirement],
+            self.design_layout: [self.analyze_document],
+            self.optimize_content: [self.analyze_document],
+            self.process_text: [self.design_layout, self.optimize_content],
+            self.unify_images: [self.design_layout],
+            self.generate_document: [self.process_text, self.unify_images],
+        })
     
     def _build_workflow(self):
-        """根据处理策略构建工作流"""
+        """根据处理策略构建工作流，返回起始节点"""
         if self.processing_strategy == "complete":
-            # 完整流程：需求解析 -> 文档分析 -> 设计布局 -> 文本处理 -> 图片处理 -> 文档生成
-            self.parse_requirement >> self.analyze_document >> self.design_layout >> self.process_text >> self.unify_images >> self.generate_document
+            # 完整流程：需求解析 -> 文档分析 -> {设计布局, 内容优化} -> {文本处理, 图片处理} -> 文档生成
+            return self._build_complete_dag()
             
         elif self.processing_strategy == "quick":
-            # 快速流程：需求解析 -> 设计布局 -> 文本处理 -> 文档生成
-            self.parse_requirement >> self.design_layout >> self.process_text >> self.generate_document
+            # 快速流程：需求解析 -> 设计布局(并发内容优化) -> 文本处理 -> 文档生成
+            self.parse_requirement >> self.design_and_optimize >> self.process_text >> self.generate_document
             
         elif self.processing_strategy == "text_only":
             # 仅文本处理：需求解析 -> 文本处理 -> 文档生成
@@ -75,7 +99,9 @@ class DocumentProcessingAsyncFlow(AsyncFlow):
             
         else:
             # 默认完整流程
-            self.parse_requirement >> self.analyze_document >> self.design_layout >> self.process_text >> self.unify_images >> self.generate_document
+            return self._build_complete_dag()
+        
+        return self.parse_requirement
     
     async def run_async(self, shared: Dict[str, Any]) -> Dict[str, Any]:
         """运行异步工作流"""
@@ -252,20 +278,19 @@ async def auto_create_optimal_flow(user_instruction: str, document_content: str)
     optimal_strategy = await selector.analyze_requirements(user_instruction, document_content)
     return create_async_document_flow(optimal_strategy)
 
+# 单文档工作流支持的处理策略
+_ASYNC_FLOW_STRATEGIES = frozenset({"complete", "quick", "text_only", "analysis_focus"})
+
 def get_async_flow_by_type(flow_type: str = "complete", **kwargs) -> DocumentProcessingAsyncFlow:
     """根据类型获取异步工作流"""
-    flows = {
-        "complete": lambda: create_async_document_flow("complete"),
-        "quick": lambda: create_async_document_flow("quick"),
-        "text_only": lambda: create_async_document_flow("text_only"),
-        "analysis_focus": lambda: create_async_document_flow("analysis_focus"),
-        "batch": lambda: create_batch_async_flow(
+    if flow_type == "batch":
+        return create_batch_async_flow(
             kwargs.get("strategy", "complete"), 
             kwargs.get("max_concurrent", 3)
         )
-    }
-    
-    return flows.get(flow_type, flows["complete"])()
+    if flow_type not in _ASYNC_FLOW_STRATEGIES:
+        flow_type = "complete"
+    return create_async_document_flow(flow_type)
 
 # 高级工作流功能
 class AdaptiveWorkflow:
@@ -297,7 +322,9 @@ class AdaptiveWorkflow:
         """分析系统负载"""
         try:
             import psutil
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # cpu_percent(interval=1) 会阻塞1秒采样，放到线程池中执行以免阻塞事件循环
+            loop = asyncio.get_event_loop()
+            cpu_percent = await loop.run_in_executor(None, psutil.cpu_percent, 1)
             memory_percent = psutil.virtual_memory().percent
             
             # 综合CPU和内存使用率
@@ -444,9 +471,16 @@ class WorkflowMonitor:
         
         return recommendations
 
-# 全局实例
-workflow_monitor = WorkflowMonitor()
-adaptive_workflow = AdaptiveWorkflow()
+# 实例在首次调用时创建：导入模块不再构造任何对象，多进程部署时每个工作进程各自持有一份
+@lru_cache(maxsize=1)
+def get_workflow_monitor() -> WorkflowMonitor:
+    """获取当前进程的工作流监控器"""
+    return WorkflowMonitor()
+
+@lru_cache(maxsize=1)
+def get_adaptive_workflow() -> AdaptiveWorkflow:
+    """获取当前进程的自适应工作流"""
+    return AdaptiveWorkflow()
 
 if __name__ == "__main__":
     async def test_async_flows():
@@ -504,7 +538,7 @@ if __name__ == "__main__":
         print(f"智能选择策略: {optimal_flow.processing_strategy}")
         
         print("\n📊 性能监控报告:")
-        print(workflow_monitor.get_performance_report())
+        print(get_workflow_monitor().get_performance_report())
     
     # 运行测试
     asyncio.run(test_async_flows())
\ No newline at end of file
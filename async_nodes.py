@@ -12,6 +12,7 @@ import yaml
 import logging
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
+from graphlib import TopologicalSorter
 from pocketflow import AsyncNode, AsyncParallelBatchNode
 
 # 导入工具函数
@@ -19,8 +20,18 @@ from utils.async_llm_pool import call_llm_async, batch_call_llm_async
 from utils.document_processor import parse_document, apply_styles, generate_html_from_markdown
 from utils.image_processor import process_image_with_effects, batch_process_images
 
+try:
+    # caio 在内核支持时使用原生异步文件IO，否则自动回退到线程池
+    from aiofile import async_open
+    AIOFILE_AVAILABLE = True
+except ImportError:
+    AIOFILE_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# 并行处理图片时同时进行的任务数上限
+IMAGE_PROCESSING_CONCURRENCY = 8
+
 @dataclass
 class ProcessingContext:
     """处理上下文数据结构"""
@@ -499,7 +510,8 @@ class AsyncProcessTextNode(AsyncNode):
             "original_content": shared.get("original_document", ""),
             "layout_design": shared.get("layout_design", {}),
             "requirements": shared.get("requirements", {}),
-            "ai_insights": shared.get("document_structure", {}).get("ai_insights", {})
+            "ai_insights": shared.get("document_structure", {}).get("ai_insights", {}),
+            "optimized_content": shared.get("optimized_content")
         }
     
     async def exec_async(self, prep_res):
@@ -512,19 +524,24 @@ class AsyncProcessTextNode(AsyncNode):
         if not content:
             return {"error": "没有文档内容可处理"}
         
-        # 并行执行样式应用和内容优化
-        style_task = asyncio.create_task(
-            self._apply_basic_styles(content, layout_design)
-        )
-        
-        optimization_task = asyncio.create_task(
-            self._optimize_content_with_ai(content, requirements, ai_insights)
-        )
-        
-        # 等待两个任务完成
-        styled_content, optimized_content = await asyncio.gather(
-            style_task, optimization_task
-        )
+        # 内容优化已由AsyncOptimizeContentNode与排版设计并发完成时直接复用
+        if prep_res.get("optimized_content") is not None:
+            styled_content = await self._apply_basic_styles(content, layout_design)
+            optimized_content = prep_res["optimized_content"]
+        else:
+            # 并行执行样式应用和内容优化
+            style_task = asyncio.create_task(
+                self._apply_basic_styles(content, layout_design)
+            )
+            
+            optimization_task = asyncio.create_task(
+                self._optimize_content_with_ai(content, requirements, ai_insights)
+            )
+            
+            # 等待两个任务完成
+            styled_content, optimized_content = await asyncio.gather(
+                style_task, optimization_task
+            )
         
         return {
             "processed_content": styled_content,
@@ -609,8 +626,97 @@ AI分析建议:
         
         return "default"
 
+class AsyncOptimizeContentNode(AsyncProcessTextNode):
+    """异步内容优化节点
+    
+    只执行文本处理中的LLM优化部分。优化提示词不依赖排版方案，
+    因此可以与AsyncDesignLayoutNode并发运行，结果写入shared["optimized_content"]。
+    """
+    
+    async def exec_async(self, prep_res):
+        """异步优化文档内容"""
+        content = prep_res["original_content"]
+        if not content:
+            return None
+        
+        return await self._optimize_content_with_ai(
+            content, prep_res["requirements"], prep_res["ai_insights"]
+        )
+    
+    async def post_async(self, shared, prep_res, exec_res):
+        """保存优化后的内容"""
+        if exec_res is not None:
+            shared["optimized_content"] = exec_res
+        return "default"
+
+class AsyncConcurrentNode(AsyncNode):
+    """异步并发节点：用asyncio.gather同时运行多个互不依赖的节点
+    
+    子节点需读写不相交的共享数据键，返回最后一个子节点的action。
+    """
+    
+    def __init__(self, nodes: List[AsyncNode], max_retries: int = 1, wait: int = 0):
+        super().__init__(max_retries=max_retries, wait=wait)
+        self.nodes = nodes
+    
+    async def _run_async(self, shared):
+        """并发运行所有子节点"""
+        actions = await asyncio.gather(*(node._run_async(shared) for node in self.nodes))
+        return actions[-1] if actions else "default"
+
+class AsyncDAGNode(AsyncNode):
+    """异步DAG节点：按显式数据依赖调度子节点
+    
+    graph 为 {节点: 依赖的节点列表}，依赖全部完成的节点立即启动，互不依赖的节点并发运行。
+    任一子节点失败时取消其余运行中的节点并抛出异常。
+    """
+    
+    def __init__(self, graph: Dict[AsyncNode, Any], max_retries: int = 1, wait: int = 0):
+        super().__init__(max_retries=max_retries, wait=wait)
+        self.graph = {node: tuple(deps) for node, deps in graph.items()}
+        # 构造时即检查环
+        TopologicalSorter(self.graph).prepare()
+    
+    async def _run_async(self, shared):
+        """按拓扑顺序并发运行子节点，返回最后完成的节点的action"""
+        sorter = TopologicalSorter(self.graph)
+        sorter.prepare()
+        running = {}
+        last_action = "default"
+        
+        try:
+            while sorter.is_active():
+                for node in sorter.get_ready():
+                    running[asyncio.create_task(node._run_async(shared))] = node
+                
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    node = running.pop(task)
+                    last_action = task.result()
+                    sorter.done(node)
+        finally:
+            for task in running:
+                task.cancel()
+            # 等待被取消的节点真正结束，并取回同批已完成节点的异常，异常向上传播后不再有节点修改 shared
+            await asyncio.gather(*running, return_exceptions=True)
+        
+        return last_action
+
 class ParallelImageProcessingNode(AsyncParallelBatchNode):
-    """并行图片处理节点"""
+    """并行图片处理节点：按并发上限同时处理各张图片，单张失败不影响其他图片"""
+    
+    def __init__(self, max_concurrent: int = IMAGE_PROCESSING_CONCURRENCY, **kwargs):
+        super().__init__(**kwargs)
+        self.max_concurrent = max_concurrent
+    
+    async def _exec(self, items):
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        
+        async def process_one(item):
+            async with semaphore:
+                return await super(AsyncParallelBatchNode, self)._exec(item)
+        
+        return await asyncio.gather(*(process_one(item) for item in items))
     
     async def prep_async(self, shared):
         """准备图片处理数据"""
@@ -690,6 +796,21 @@ class ParallelImageProcessingNode(AsyncParallelBatchNode):
         
         return processed_image
     
+    async def exec_fallback_async(self, image_task, exc):
+        """重试后仍失败的图片记录错误并保留原图，其余图片照常完成"""
+        img_info = image_task["image_info"]
+        logger.warning(f"图片处理失败 {img_info.get('url')}: {exc}")
+        return {
+            "original_url": img_info.get("url"),
+            "alt_text": img_info.get("alt_text"),
+            "effects_applied": {},
+            "new_url": img_info.get("url"),
+            "section": img_info.get("section", ""),
+            "processing_time": 0,
+            "file_size_optimized": False,
+            "error": str(exc)
+        }
+    
     def _parse_size(self, size_str: str) -> int:
         """解析尺寸字符串"""
         try:
@@ -705,7 +826,8 @@ class ParallelImageProcessingNode(AsyncParallelBatchNode):
             "processing_summary": {
                 "effects_applied": len([img for img in exec_res_list if img.get("effects_applied")]),
                 "size_optimized": len([img for img in exec_res_list if img.get("file_size_optimized")]),
-                "total_processing_time": sum(img.get("processing_time", 0) for img in exec_res_list)
+                "total_processing_time": sum(img.get("processing_time", 0) for img in exec_res_list),
+                "failed": len([img for img in exec_res_list if img.get("error")])
             }
         }
         
@@ -915,7 +1037,6 @@ class AsyncGenerateDocumentNode(AsyncNode):
         """异步保存文档到文件"""
         try:
             import os
-            import aiofiles
             
             format_type = document.get("format", "HTML").lower()
             content = document.get("content", "")
@@ -930,8 +1051,14 @@ class AsyncGenerateDocumentNode(AsyncNode):
             else:
                 filename = f"output/formatted_document.{format_type.lower()}"
             
-            async with aiofiles.open(filename, "w", encoding="utf-8") as f:
-                await f.write(content)
+            data = content.encode("utf-8")
+            if AIOFILE_AVAILABLE:
+                async with async_open(filename, "wb") as f:
+                    await f.write(data)
+            else:
+                import aiofiles
+                async with aiofiles.open(filename, "wb") as f:
+                    await f.write(data)
             
             logger.info(f"文档已异步保存到: {filename}")
         
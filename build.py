@@ -13,6 +13,10 @@ import shutil
 import zipfile
 from pathlib import Path
 import argparse
+from collections import deque
+
+# 构建失败时回显的输出行数
+BUILD_LOG_TAIL_LINES = 20
 
 def check_dependencies():
     """检查构建依赖"""
@@ -82,21 +86,27 @@ def build_executable(mode='onefile'):
     ]
     
     try:
-        # 运行PyInstaller
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-        print("  ✅ 构建成功!")
+        # 运行PyInstaller，输出逐行实时显示，只保留最后若干行用于失败时回显
+        tail = deque(maxlen=BUILD_LOG_TAIL_LINES)
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              bufsize=1, text=True) as proc:
+            for line in proc.stdout:
+                tail.append(line)
+                print(line, end='')
+        
+        if proc.returncode != 0:
+            print("  ❌ 构建失败!")
+            print(f"错误: 命令返回非零退出码 {proc.returncode}")
+            print("错误详情（输出末尾）:")
+            print(''.join(tail), end='')
+            return False
         
-        if result.stdout:
-            print("构建输出:")
-            print(result.stdout)
-            
+        print("  ✅ 构建成功!")
         return True
         
-    except subprocess.CalledProcessError as e:
+    except OSError as e:
         print("  ❌ 构建失败!")
         print(f"错误: {e}")
-        if e.stderr:
-            print(f"错误详情: {e.stderr}")
         return False
 
 def create_package():
@@ -108,11 +118,12 @@ def create_package():
         print("  ❌ 构建目录不存在")
         return False
     
-    # 查找可执行文件（Linux和Windows兼容）
-    exe_files = list(dist_dir.glob("*.exe"))  # Windows
-    if not exe_files:
-        # 查找Linux可执行文件
-        exe_files = [f for f in dist_dir.iterdir() if f.is_file() and f.name == "DocumentProcessor"]
+    # 查找可执行文件（Linux和Windows兼容），一次遍历目录同时匹配两种平台，Windows的 .exe 优先
+    exe_files = sorted(
+        (f for f in dist_dir.iterdir()
+         if f.is_file() and (f.suffix == ".exe" or f.name == "DocumentProcessor")),
+        key=lambda f: f.suffix != ".exe"
+    )
     
     if not exe_files:
         print("  ❌ 没有找到可执行文件")
@@ -1,20 +1,44 @@
+import os
+import re
 from pocketflow import Flow
 from nodes import (
     ParseRequirementNode, 
     AnalyzeDocumentNode, 
+    BatchedLLMNode,
     DesignLayoutNode,
     ProcessTextNode,
     UnifyImagesNode,
     GenerateDocumentNode,
     ErrorHandlingNode
 )
+from utils.image_processor import prewarm_image_pool
+
+_IMAGE_URL_RE = re.compile(r'!\[.*?\]\((.*?)\)')
+
+def _count_local_images(document: str) -> int:
+    """文档中引用的本地存在的图片数"""
+    if "![" not in document:
+        return 0
+    return sum(1 for url in _IMAGE_URL_RE.findall(document) if os.path.isfile(url))
+
+class ImageProcessingFlow(Flow):
+    """
+    包含图片处理的工作流：文档中有至少两张本地图片时在流程开始就预热图片进程池，
+    工作进程的启动与前面节点的LLM调用重叠，到图片节点时可直接使用。
+    远程图片不经过进程池，单张图片在当前进程内直接处理，这两种情况都不预热
+    """
+    
+    def prep(self, shared):
+        if _count_local_images(shared.get("original_document", "")) >= 2:
+            prewarm_image_pool()
+        return super().prep(shared)
 
 def create_document_processing_flow():
     """
     创建智能文档处理工作流
     
     工作流程：
-    1. 解析用户需求 -> 分析文档结构
+    1. 解析用户需求 + 分析文档结构（互不依赖，合并为一次LLM调用）
     2. 分析文档结构 -> 设计排版方案
     3. 设计排版方案 -> 处理文本格式
     4. 处理文本格式 -> 统一图片样式
@@ -22,8 +46,10 @@ def create_document_processing_flow():
     """
     
     # 创建节点实例
-    parse_requirement = ParseRequirementNode(max_retries=2, wait=1)
-    analyze_document = AnalyzeDocumentNode(max_retries=2, wait=1)
+    parse_and_analyze = BatchedLLMNode(
+        [ParseRequirementNode(), AnalyzeDocumentNode()],
+        max_retries=2, wait=1
+    )
     design_layout = DesignLayoutNode(max_retries=3, wait=2)
     process_text = ProcessTextNode(max_retries=2, wait=1)
     unify_images = UnifyImagesNode(max_retries=2, wait=1)
@@ -31,10 +57,10 @@ def create_document_processing_flow():
     error_handler = ErrorHandlingNode()
     
     # 构建工作流链
-    parse_requirement >> analyze_document >> design_layout >> process_text >> unify_images >> generate_document
+    parse_and_analyze >> design_layout >> process_text >> unify_images >> generate_document
     
     # 创建并返回流程
-    document_flow = Flow(start=parse_requirement)
+    document_flow = ImageProcessingFlow(start=parse_and_analyze)
     return document_flow
 
 def create_simple_formatting_flow():
@@ -65,15 +91,24 @@ def create_image_only_flow():
     
     analyze_document >> design_layout >> unify_images
     
-    image_flow = Flow(start=analyze_document)
+    image_flow = ImageProcessingFlow(start=analyze_document)
     return image_flow
 
-# 主要的文档处理流程
-document_processing_flow = create_document_processing_flow()
+# 流程按类型登记构建函数，首次使用时才构建并缓存复用，
+# 只用到其中一种流程的进程不会构建其余流程的节点
+_FLOW_FACTORIES = {
+    "complete": create_document_processing_flow,
+    "simple": create_simple_formatting_flow,
+    "image": create_image_only_flow
+}
+_FLOWS = {}
 
-# 备用流程
-simple_flow = create_simple_formatting_flow()
-image_flow = create_image_only_flow()
+# 兼容原模块级流程变量名
+_FLOW_ALIASES = {
+    "document_processing_flow": "complete",
+    "simple_flow": "simple",
+    "image_flow": "image"
+}
 
 def get_flow_by_type(flow_type="complete"):
     """
@@ -88,13 +123,18 @@ def get_flow_by_type(flow_type="complete"):
     Returns:
         Flow: 对应的工作流对象
     """
-    flows = {
-        "complete": document_processing_flow,
-        "simple": simple_flow,
-        "image": image_flow
-    }
-    
-    return flows.get(flow_type, document_processing_flow)
+    if flow_type not in _FLOW_FACTORIES:
+        flow_type = "complete"
+    flow = _FLOWS.get(flow_type)
+    if flow is None:
+        flow = _FLOWS[flow_type] = _FLOW_FACTORIES[flow_type]()
+    return flow
+
+def __getattr__(name):
+    """按需构建 document_processing_flow / simple_flow / image_flow"""
+    if name in _FLOW_ALIASES:
+        return get_flow_by_type(_FLOW_ALIASES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     # 测试工作流创建
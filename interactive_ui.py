@@ -7,14 +7,90 @@
 """
 
 import os
+import re
 import sys
 import json
+import itertools
 from typing import Dict, List, Any
 from flow import get_flow_by_type
-from utils.call_llm import call_llm
+from utils.call_llm import call_llm_stream
+from utils.console_input import read_pasted_content
 import time
 from pathlib import Path
 
+# 命令关键词（模块级常量，避免每轮输入都重新构造列表）
+_QUIT = frozenset({'quit', 'exit', '退出', 'q'})
+_HELP = frozenset({'help', '帮助', 'h'})
+_TEMPLATES = frozenset({'templates', '模板', 't'})
+_PREFERENCES = frozenset({'preferences', '偏好', 'prefs'})
+_DONE = frozenset({'done', '完成', 'finish'})
+_PREVIEW = frozenset({'preview', '预览'})
+_REFINE_HELP = frozenset({'help', '帮助'})
+_YES = frozenset({'y', 'yes', '是'})
+_REFINE_YES = _YES | {'需要'}
+
+# 从文件读取的文档大小上限（与命令行入口一致）
+MAX_DOCUMENT_BYTES = 20 * 1024 * 1024
+
+# 建议行格式: "1. xxx" / "2、xxx" / "- xxx" / "• xxx"
+_SUGG_RE = re.compile(r'^\s*(?:\d+\s*[.、)）]|[-•])\s*(.+?)\s*$')
+
+def _iter_lines(chunks):
+    """把流式文本块拼接为完整的行"""
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split('\n')
+        yield from lines
+    if buffer:
+        yield buffer
+
+def _parse_suggestions(lines):
+    """逐行匹配建议条目，按出现顺序产出"""
+    for line in lines:
+        match = _SUGG_RE.match(line)
+        if match:
+            yield match.group(1)
+
+# 示例文档（“使用示例文档”选项）
+_EXAMPLE_DOCUMENT = """
+# 智能科技产品介绍
+
+## 产品概述
+
+我们的智能产品采用了最新的人工智能技术，为用户提供前所未有的智能体验。
+
+![产品主图](product-main.jpg)
+
+## 核心特性
+
+### 🤖 智能交互
+- 自然语言理解
+- 多轮对话支持
+- 个性化学习
+
+### ⚡ 高效处理
+- 实时响应
+- 批量处理
+- 云端同步
+
+![功能展示](features.png)
+
+## 技术优势
+
+1. **先进算法**: 基于深度学习的核心算法
+2. **高度集成**: 无缝集成现有系统
+3. **安全可靠**: 企业级安全保障
+
+## 应用场景
+
+适用于教育、医疗、金融、制造等多个行业，帮助用户提升工作效率。
+
+## 联系我们
+
+了解更多详情，请访问我们的官网或联系销售团队。
+"""
+
 class DocumentProcessor:
     """增强的文档处理器"""
     
@@ -29,8 +105,7 @@ class DocumentProcessor:
         prefs_file = "user_preferences.json"
         if os.path.exists(prefs_file):
             try:
-                with open(prefs_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                return json.loads(Path(prefs_file).read_text(encoding='utf-8'))
             except:
                 pass
         return {
@@ -46,8 +121,9 @@ class DocumentProcessor:
     def save_user_preferences(self):
         """保存用户偏好设置"""
         try:
-            with open("user_preferences.json", 'w', encoding='utf-8') as f:
-                json.dump(self.user_preferences, f, ensure_ascii=False, indent=2)
+            Path("user_preferences.json").write_text(
+                json.dumps(self.user_preferences, ensure_ascii=False, indent=2), encoding='utf-8'
+            )
         except Exception as e:
             print(f"保存偏好设置失败: {e}")
 
@@ -125,8 +201,9 @@ class InteractiveUI:
             print(f"   🌈 主色调: {template['colors']['primary']}")
             print()
     
-    def get_smart_suggestions(self, user_input: str, document_content: str = "") -> List[str]:
-        """获取智能建议"""
+    def get_smart_suggestions(self, user_input: str, document_content: str = "",
+                              echo: bool = False) -> List[str]:
+        """获取智能建议（流式解析，echo为True时每得到一条建议立即打印）"""
         prompt = f"""
 作为专业的文档设计顾问，根据用户的输入和文档内容，提供3个具体的优化建议。
 
@@ -141,22 +218,25 @@ class InteractiveUI:
 建议应该具体、可执行，并能明显改善文档效果。
 """
         
+        suggestions = []
         try:
-            response = call_llm(prompt)
-            suggestions = []
-            for line in response.split('\n'):
-                line = line.strip()
-                if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•')):
-                    suggestion = line.split('.', 1)[-1].strip() if '.' in line else line[1:].strip()
-                    if suggestion:
-                        suggestions.append(suggestion)
-            return suggestions[:3]
+            lines = _iter_lines(call_llm_stream(prompt))
+            # 取到第3条建议即停止消费，流式响应随之关闭
+            for suggestion in itertools.islice(_parse_suggestions(lines), 3):
+                suggestions.append(suggestion)
+                if echo:
+                    print(f"   {len(suggestions)}. {suggestion}")
+            return suggestions
         except:
-            return [
+            fallback = [
                 "尝试使用更现代的配色方案",
                 "增加图片的视觉效果",
                 "优化标题层级结构"
             ]
+            if echo:
+                for i, suggestion in enumerate(fallback[len(suggestions):], len(suggestions) + 1):
+                    print(f"   {i}. {suggestion}")
+            return suggestions + fallback[len(suggestions):]
     
     def process_template_choice(self, choice: str, document_content: str):
         """处理模板选择"""
@@ -194,18 +274,17 @@ class InteractiveUI:
         
         while True:
             adjustment = input("\n🎯 请描述您想要的调整: ").strip()
+            lowered = adjustment.lower()
             
-            if adjustment.lower() in ['done', '完成', 'finish']:
+            if lowered in _DONE:
                 break
-            elif adjustment.lower() in ['preview', '预览']:
+            elif lowered in _PREVIEW:
                 self.show_preview(shared_data)
                 continue
-            elif adjustment.lower() in ['help', '帮助']:
+            elif lowered in _REFINE_HELP:
                 print("💡 调整建议：")
                 if "original_document" in shared_data:
-                    suggestions = self.get_smart_suggestions(adjustment, shared_data["original_document"])
-                    for i, suggestion in enumerate(suggestions, 1):
-                        print(f"   {i}. {suggestion}")
+                    self.get_smart_suggestions(adjustment, shared_data["original_document"], echo=True)
                 continue
             elif not adjustment:
                 continue
@@ -234,29 +313,31 @@ class InteractiveUI:
                 
     def show_preview(self, shared_data: Dict[str, Any]):
         """显示文档预览"""
-        if "final_document" not in shared_data:
+        final_doc = shared_data.get("final_document")
+        if final_doc is None:
             print("❌ 没有可预览的文档")
             return
         
-        final_doc = shared_data["final_document"]
         content = final_doc.get("content", "")
+        content_len = len(content)
+        req = shared_data.get("requirements")
+        images = shared_data.get("processed_images", {}).get("processed_images")
         
         print("\n📖 文档预览:")
         print("=" * 60)
         
         # 显示基本信息
         print(f"📄 格式: {final_doc.get('format', 'Unknown')}")
-        print(f"📏 长度: {len(content)}字符")
+        print(f"📏 长度: {content_len}字符")
         
-        if "requirements" in shared_data:
-            req = shared_data["requirements"]
+        if req is not None:
             print(f"🎨 风格: {req.get('style', 'Unknown')}")
             print(f"🌈 配色: {req.get('layout', {}).get('color_scheme', 'Unknown')}")
         
         # 显示内容预览（前500字符）
         if content:
             preview_content = content[:500]
-            if len(content) > 500:
+            if content_len > 500:
                 preview_content += "..."
             
             print("\n📝 内容预览:")
@@ -265,12 +346,10 @@ class InteractiveUI:
             print("-" * 40)
         
         # 显示处理的图片信息
-        if "processed_images" in shared_data:
-            images_info = shared_data["processed_images"]
-            if images_info.get("processed_images"):
-                print(f"\n🖼️  已处理图片: {len(images_info['processed_images'])}张")
-                for img in images_info["processed_images"][:3]:  # 显示前3张
-                    print(f"   • {img.get('alt_text', '未命名图片')}")
+        if images:
+            print(f"\n🖼️  已处理图片: {len(images)}张")
+            for img in images[:3]:  # 显示前3张
+                print(f"   • {img.get('alt_text', '未命名图片')}")
         
         print("=" * 60)
     
@@ -281,22 +360,27 @@ class InteractiveUI:
         
         session_file = session_dir / f"session_{self.session_id}.json"
         
+        final_doc = shared_data.get("final_document", {})
+        req = shared_data.get("requirements", {})
+        images = shared_data.get("processed_images", {}).get("processed_images", [])
+        
         session_data = {
             "session_id": self.session_id,
             "timestamp": time.time(),
             "conversation_history": self.processor.conversation_history,
-            "final_result": shared_data.get("final_document", {}),
+            "final_result": final_doc,
             "user_instruction": shared_data.get("user_instruction", ""),
             "processing_summary": {
-                "style": shared_data.get("requirements", {}).get("style", ""),
-                "format": shared_data.get("final_document", {}).get("format", ""),
-                "images_processed": len(shared_data.get("processed_images", {}).get("processed_images", []))
+                "style": req.get("style", ""),
+                "format": final_doc.get("format", ""),
+                "images_processed": len(images)
             }
         }
         
         try:
-            with open(session_file, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, ensure_ascii=False, indent=2)
+            session_file.write_text(
+                json.dumps(session_data, ensure_ascii=False, indent=2), encoding='utf-8'
+            )
             print(f"💾 会话已保存: {session_file}")
         except Exception as e:
             print(f"⚠️  保存会话失败: {e}")
@@ -316,16 +400,17 @@ class InteractiveUI:
                     continue
                     
                 # 处理特殊命令
-                if user_input.lower() in ['quit', 'exit', '退出', 'q']:
+                lowered = user_input.lower()
+                if lowered in _QUIT:
                     print("👋 谢谢使用！再见！")
                     break
-                elif user_input.lower() in ['help', '帮助', 'h']:
+                elif lowered in _HELP:
                     self.show_help()
                     continue
-                elif user_input.lower() in ['templates', '模板', 't']:
+                elif lowered in _TEMPLATES:
                     self.show_templates()
                     continue
-                elif user_input.lower() in ['preferences', '偏好', 'prefs']:
+                elif lowered in _PREFERENCES:
                     self.show_preferences()
                     continue
                 
@@ -341,12 +426,9 @@ class InteractiveUI:
                     instruction = user_input
                 
                 # 提供智能建议
-                suggestions = self.get_smart_suggestions(instruction, document_content)
+                print("\n💡 AI建议:")
+                suggestions = self.get_smart_suggestions(instruction, document_content, echo=True)
                 if suggestions:
-                    print("\n💡 AI建议:")
-                    for i, suggestion in enumerate(suggestions, 1):
-                        print(f"   {i}. {suggestion}")
-                    
                     use_suggestion = input("\n是否采用某个建议？(输入编号或直接回车继续): ").strip()
                     if use_suggestion.isdigit():
                         idx = int(use_suggestion) - 1
@@ -375,7 +457,7 @@ class InteractiveUI:
                         
                         # 询问是否需要调整
                         refine = input("\n🔧 是否需要进一步调整？(y/n): ").strip().lower()
-                        if refine in ['y', 'yes', '是', '需要']:
+                        if refine in _REFINE_YES:
                             self.interactive_refinement(shared_data)
                         
                         # 保存会话
@@ -418,8 +500,16 @@ class InteractiveUI:
             file_path = input("📁 文件路径: ").strip()
             if os.path.exists(file_path):
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        return f.read()
+                    # 先按文件大小校验上限再读取，超大文件不会被整个读入内存
+                    with open(file_path, 'rb') as f:
+                        if os.fstat(f.fileno()).st_size > MAX_DOCUMENT_BYTES:
+                            print(f"❌ 文件超过大小上限 {MAX_DOCUMENT_BYTES // (1024 * 1024)}MB")
+                            return None
+                        content = f.read().decode('utf-8')
+                    if '\r' in content:
+                        # 与文本模式读取保持一致，统一换行符
+                        content = content.replace('\r\n', '\n').replace('\r', '\n')
+                    return content
                 except Exception as e:
                     print(f"❌ 读取文件失败: {e}")
                     return None
@@ -428,53 +518,10 @@ class InteractiveUI:
                 return None
                 
         elif choice == "2":
-            print("📝 请粘贴内容 (输入'END'结束):")
-            lines = []
-            while True:
-                line = input()
-                if line.strip().upper() == 'END':
-                    break
-                lines.append(line)
-            return '\n'.join(lines)
+            return read_pasted_content("📝 请粘贴内容 (按 Ctrl-D 结束，Windows 下按 Ctrl-Z 后回车):")
             
         elif choice == "3":
-            return """
-# 智能科技产品介绍
-
-## 产品概述
-
-我们的智能产品采用了最新的人工智能技术，为用户提供前所未有的智能体验。
-
-![产品主图](product-main.jpg)
-
-## 核心特性
-
-### 🤖 智能交互
-- 自然语言理解
-- 多轮对话支持
-- 个性化学习
-
-### ⚡ 高效处理
-- 实时响应
-- 批量处理
-- 云端同步
-
-![功能展示](features.png)
-
-## 技术优势
-
-1. **先进算法**: 基于深度学习的核心算法
-2. **高度集成**: 无缝集成现有系统
-3. **安全可靠**: 企业级安全保障
-
-## 应用场景
-
-适用于教育、医疗、金融、制造等多个行业，帮助用户提升工作效率。
-
-## 联系我们
-
-了解更多详情，请访问我们的官网或联系销售团队。
-"""
+            return _EXAMPLE_DOCUMENT
         else:
             print("❌ 无效选择")
             return None
@@ -511,7 +558,7 @@ class InteractiveUI:
         print()
         
         modify = input("是否修改偏好设置？(y/n): ").strip().lower()
-        if modify in ['y', 'yes', '是']:
+        if modify in _YES:
             # 这里可以添加偏好设置的修改逻辑
             print("💡 偏好设置功能正在开发中...")
 
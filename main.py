@@ -9,63 +9,251 @@
 import os
 import sys
 import argparse
-import json
+import atexit
+import hashlib
+import importlib
+import mmap
+import re
+import shelve
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from flow import get_flow_by_type
+from utils.console_input import read_pasted_content
+from utils.logging_utils import CachedTimeFormatter
 import logging
-from typing import Dict, Any, Optional
+import logging.handlers
+import queue
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
+from typing import Callable, Dict, Any, List, Optional
 
-# 导入新功能模块
 try:
-    from utils.content_analyzer import analyze_document_comprehensive
-    from utils.format_converter import FormatConverter, get_supported_formats
-    from utils.template_manager import get_template_manager, recommend_templates_for_content
-    from interactive_ui import InteractiveUI
-    NEW_FEATURES_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️  新功能模块加载失败: {e}")
-    print("   将使用基础功能模式")
-    NEW_FEATURES_AVAILABLE = False
-
-# 配置日志
+    import fcntl
+except ImportError:
+    # Windows 没有 fcntl，磁盘缓存只做进程内加锁
+    fcntl = None
+
+# 单个输入文档的大小上限，超出时直接拒绝，避免异常大文件占满内存
+MAX_DOCUMENT_BYTES = 20 * 1024 * 1024
+
+# 超过该大小的文档通过mmap直接从页缓存解码，省去一次中间bytes拷贝
+MMAP_THRESHOLD_BYTES = 1024 * 1024
+
+# 批量处理支持的输入文件扩展名
+SUPPORTED_EXTENSIONS = frozenset({'.md', '.markdown', '.txt'})
+
+# 指令超过该词数时使用完整流程
+COMPLEX_INSTRUCTION_WORDS = 50
+_WORD_RE = re.compile(r'\S+')
+
+def _is_complex_instruction(instruction: str) -> bool:
+    """判断指令词数是否超过 COMPLEX_INSTRUCTION_WORDS，数到上限即停止扫描"""
+    return next(islice(_WORD_RE.finditer(instruction), COMPLEX_INSTRUCTION_WORDS, None), None) is not None
+
+# 文件扩展名到文档类型的映射，未知扩展名默认作为文本处理
+_EXT_TO_TYPE = {'.md': 'markdown', '.markdown': 'markdown', '.txt': 'text'}
+
+@lru_cache(maxsize=None)
+def _import_feature(module_name: str):
+    """按需导入新功能模块，导入失败时返回None（结果缓存，失败只提示一次）"""
+    try:
+        return importlib.import_module(module_name)
+    except ImportError as e:
+        print(f"⚠️  新功能模块加载失败: {e}")
+        print("   将使用基础功能模式")
+        return None
+
+# 分析结果的磁盘缓存，跨进程保留，重新处理同一文档时复用；与LLM缓存、语义缓存同放在用户缓存目录下。
+# 分析结果含 temperature=0.7 的LLM输出，与LLM缓存共用开关：设置 POCKETFLOW_LLM_CACHE=1 时才启用
+DOC_CACHE_PATH = Path.home() / ".pocketflow" / "doc_cache"
+DOC_CACHE_TTL = 7 * 24 * 3600  # 秒
+# call_llm 调用失败时返回的文本前缀，含此类文本的结果不缓存
+LLM_ERROR_PREFIX = "错误: "
+
+_doc_cache_lock = threading.Lock()
+
+def _doc_cache_enabled() -> bool:
+    return os.getenv("POCKETFLOW_LLM_CACHE", "").lower() in ("1", "true", "yes", "on")
+
+def _has_llm_error(value) -> bool:
+    """结果中是否含有LLM调用失败的文本"""
+    if isinstance(value, str):
+        return value.startswith(LLM_ERROR_PREFIX)
+    if isinstance(value, dict):
+        return any(_has_llm_error(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_has_llm_error(v) for v in value)
+    return False
+
+@contextmanager
+def _locked_doc_cache():
+    """
+    打开磁盘缓存并加锁：线程锁保护进程内的并发访问，支持 fcntl 的平台上再对锁文件加排他锁，
+    多个进程共用同一缓存文件时也不会同时读写；Windows 上只有进程内的锁，同一缓存只应由单个进程使用
+    """
+    with _doc_cache_lock:
+        DOC_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(DOC_CACHE_PATH.with_suffix(".lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with shelve.open(str(DOC_CACHE_PATH)) as db:
+                yield db
+
+def _content_digest(*parts: str) -> str:
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+def _disk_cached(key: str, compute):
+    """从磁盘缓存读取结果，未命中或超过 DOC_CACHE_TTL 时调用 compute 并写回；未启用缓存时直接计算"""
+    if not _doc_cache_enabled():
+        return compute()
+    
+    try:
+        with _locked_doc_cache() as db:
+            entry = db.get(key)
+    except Exception as e:
+        logger.warning(f"读取文档缓存失败: {e}")
+        entry = None
+    if entry is not None and time.time() - entry[0] < DOC_CACHE_TTL:
+        return entry[1]
+    
+    value = compute()
+    if _has_llm_error(value):
+        return value
+    try:
+        with _locked_doc_cache() as db:
+            db[key] = (time.time(), value)
+    except Exception as e:
+        logger.warning(f"写入文档缓存失败: {e}")
+    return value
+
+# 分析与模板推荐结果按文档内容缓存：同一文档重复处理（例如只调整指令）时不再重复调用LLM。
+# 进程内缓存以内容摘要为键，不持有文档原文；含LLM调用失败文本的结果不缓存
+RESULT_MEMO_MAXSIZE = 128
+_result_memo: "OrderedDict[str, Any]" = OrderedDict()
+_result_memo_lock = threading.Lock()
+
+def _memoized(key: str, compute):
+    """按 key 读取进程内缓存（LRU，最多 RESULT_MEMO_MAXSIZE 项），未命中时经磁盘缓存计算"""
+    with _result_memo_lock:
+        if key in _result_memo:
+            _result_memo.move_to_end(key)
+            return _result_memo[key]
+    
+    value = _disk_cached(key, compute)
+    if not _has_llm_error(value):
+        with _result_memo_lock:
+            _result_memo[key] = value
+            if len(_result_memo) > RESULT_MEMO_MAXSIZE:
+                _result_memo.popitem(last=False)
+    return value
+
+def _cached_analysis(content: str) -> Dict[str, Any]:
+    return _memoized(
+        f"analysis:{_content_digest(content)}",
+        lambda: _import_feature("utils.content_analyzer").analyze_document_comprehensive(content)
+    )
+
+def _cached_recommendations(content: str, instruction: str) -> list:
+    return _memoized(
+        f"templates:{_content_digest(content, instruction)}",
+        lambda: _import_feature("utils.template_manager").recommend_templates_for_content(content, instruction)
+    )
+
+# 配置日志：调用线程只把记录放入队列，由后台监听线程写文件和控制台
+_log_formatter = CachedTimeFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [
+    logging.FileHandler('document_processor.log'),
+    logging.StreamHandler(sys.stdout)
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, *_log_handlers)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# 队列处理器只传递原始消息，由文件和控制台处理器统一格式化
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter('%(message)s'))
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('document_processor.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
+    handlers=[_queue_handler]
 )
 
 logger = logging.getLogger(__name__)
 
+def _get_flow(flow_type: str):
+    """按需导入工作流（会加载LLM客户端、图片处理等依赖），仅查看信息时无需导入"""
+    from flow import get_flow_by_type
+    return get_flow_by_type(flow_type)
+
+def _iter_document_files(input_path: Path):
+    """单次遍历目录，逐个产出支持的文档文件"""
+    with os.scandir(input_path) as entries:
+        for entry in entries:
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield Path(entry.path)
+
 class DocumentProcessorApp:
     """文档处理应用主类"""
     
     def __init__(self):
-        if NEW_FEATURES_AVAILABLE:
-            self.format_converter = FormatConverter()
-            self.template_manager = get_template_manager()
-            self.supported_formats = get_supported_formats()
-        else:
-            self.format_converter = None
-            self.template_manager = None
-            self.supported_formats = ['HTML']
+        # 新功能组件在首次使用时才创建
+        self._format_converter = None
+        self._template_manager = None
+        self._supported_formats = None
+    
+    @property
+    def format_converter(self):
+        if self._format_converter is None:
+            module = _import_feature("utils.format_converter")
+            if module is not None:
+                self._format_converter = module.FormatConverter()
+        return self._format_converter
+    
+    @property
+    def template_manager(self):
+        if self._template_manager is None:
+            module = _import_feature("utils.template_manager")
+            if module is not None:
+                self._template_manager = module.get_template_manager()
+        return self._template_manager
+    
+    @property
+    def supported_formats(self):
+        if self._supported_formats is None:
+            converter = self.format_converter
+            self._supported_formats = converter.supported_formats if converter else ['HTML']
+        return self._supported_formats
         
     def load_document_from_file(self, file_path: str) -> tuple[Optional[str], Optional[str]]:
         """从文件加载文档内容"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            # 二进制读取并一次性解码，读取量以 MAX_DOCUMENT_BYTES 为上限
+            too_large = ValueError(f"文件超过大小上限 {MAX_DOCUMENT_BYTES // (1024 * 1024)}MB: {file_path}")
+            with open(file_path, 'rb', buffering=65536) as f:
+                size = os.fstat(f.fileno()).st_size
+                if size > MAX_DOCUMENT_BYTES:
+                    raise too_large
+                if size >= MMAP_THRESHOLD_BYTES:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        content = str(mm, 'utf-8')
+                else:
+                    data = f.read(MAX_DOCUMENT_BYTES + 1)
+                    if len(data) > MAX_DOCUMENT_BYTES:
+                        raise too_large
+                    content = data.decode('utf-8')
+            if '\r' in content:
+                # 与文本模式读取保持一致，统一换行符
+                content = content.replace('\r\n', '\n').replace('\r', '\n')
             
             # 根据文件扩展名确定文件类型
-            extension = Path(file_path).suffix.lower()
-            if extension in ['.md', '.markdown']:
-                file_type = 'markdown'
-            elif extension in ['.txt']:
-                file_type = 'text'
-            else:
-                file_type = 'text'  # 默认作为文本处理
+            file_type = _EXT_TO_TYPE.get(Path(file_path).suffix.lower(), 'text')
             
             return content, file_type
         except Exception as e:
@@ -74,33 +262,35 @@ class DocumentProcessorApp:
 
     def analyze_document(self, content: str) -> Dict[str, Any]:
         """分析文档内容"""
-        if not NEW_FEATURES_AVAILABLE:
+        if _import_feature("utils.content_analyzer") is None:
             return {}
             
         try:
             logger.info("开始分析文档内容...")
-            analysis_result = analyze_document_comprehensive(content)
+            analysis_result = _cached_analysis(content)
             
-            print("\n📊 文档分析结果:")
-            print("-" * 50)
+            buf = []
+            buf.append("\n📊 文档分析结果:")
+            buf.append("-" * 50)
             
             # 显示整体评分
             overall_score = analysis_result.get("overall_score", {})
-            print(f"📈 整体评分: {overall_score.get('overall_score', 0)}/100 ({overall_score.get('grade', 'N/A')})")
+            buf.append(f"📈 整体评分: {overall_score.get('overall_score', 0)}/100 ({overall_score.get('grade', 'N/A')})")
             
             # 显示各项得分
             component_scores = overall_score.get("component_scores", {})
-            print(f"   可读性: {component_scores.get('readability', 0)}/100")
-            print(f"   结构性: {component_scores.get('structure', 0)}/100") 
-            print(f"   内容质量: {component_scores.get('quality', 0)}/100")
+            buf.append(f"   可读性: {component_scores.get('readability', 0)}/100")
+            buf.append(f"   结构性: {component_scores.get('structure', 0)}/100") 
+            buf.append(f"   内容质量: {component_scores.get('quality', 0)}/100")
             
             # 显示主要问题
             suggestions = analysis_result.get("suggestions", [])
             if suggestions:
-                print(f"\n💡 优化建议 ({len(suggestions)}条):")
+                buf.append(f"\n💡 优化建议 ({len(suggestions)}条):")
                 for i, suggestion in enumerate(suggestions[:3], 1):
-                    print(f"   {i}. {suggestion.get('title', '')}")
-                    print(f"      {suggestion.get('description', '')}")
+                    buf.append(f"   {i}. {suggestion.get('title', '')}")
+                    buf.append(f"      {suggestion.get('description', '')}")
+            sys.stdout.write('\n'.join(buf) + '\n')
             
             return analysis_result
             
@@ -110,25 +300,27 @@ class DocumentProcessorApp:
 
     def recommend_templates(self, content: str, instruction: str = "") -> list:
         """推荐适合的模板"""
-        if not NEW_FEATURES_AVAILABLE:
+        if _import_feature("utils.template_manager") is None:
             return []
             
         try:
             logger.info("正在推荐适合的模板...")
-            recommendations = recommend_templates_for_content(content, instruction)
+            recommendations = _cached_recommendations(content, instruction)
             
             if recommendations:
-                print("\n🎯 模板推荐:")
-                print("-" * 50)
+                buf = []
+                buf.append("\n🎯 模板推荐:")
+                buf.append("-" * 50)
                 for i, rec in enumerate(recommendations[:3], 1):
                     template = rec["template"]
                     score = rec["score"]
                     reasons = rec["reasons"]
                     
-                    print(f"{i}. 【{template.name}】(匹配度: {score:.1%})")
-                    print(f"   📝 {template.description}")
-                    print(f"   💡 推荐理由: {', '.join(reasons)}")
-                    print()
+                    buf.append(f"{i}. 【{template.name}】(匹配度: {score:.1%})")
+                    buf.append(f"   📝 {template.description}")
+                    buf.append(f"   💡 推荐理由: {', '.join(reasons)}")
+                    buf.append("")
+                sys.stdout.write('\n'.join(buf) + '\n')
                     
                 return recommendations
             else:
@@ -147,21 +339,18 @@ class DocumentProcessorApp:
         logger.info(f"开始处理文档: {input_file}")
         
         # 加载文档
-        content, file_type = self.load_document_from_file(input_file)
+        content, file_type = self._load_and_report(input_file)
         if content is None:
             return False
         
-        print(f"📄 加载文档: {Path(input_file).name}")
-        print(f"📏 文档长度: {len(content)}字符")
-        
         # 文档分析
         analysis_result = {}
-        if enable_analysis and NEW_FEATURES_AVAILABLE:
+        if enable_analysis:
             analysis_result = self.analyze_document(content)
         
         # 模板推荐
         template_recommendations = []
-        if enable_template_recommendation and NEW_FEATURES_AVAILABLE:
+        if enable_template_recommendation:
             template_recommendations = self.recommend_templates(content, instruction)
             
             # 询问是否使用推荐模板
@@ -178,36 +367,71 @@ class DocumentProcessorApp:
                         # 增加模板使用计数
                         self.template_manager.use_template(template.name)
         
+        return self._run_flow(content, file_type, instruction, output_format, {
+            "analysis_result": analysis_result,
+            "template_recommendations": template_recommendations
+        })
+
+    def _process_batch_file(self, input_file: str, instruction: str,
+                            output_format: str = 'HTML') -> tuple[bool, List[str]]:
+        """
+        批量处理中的单个文件：只加载并运行工作流，不做分析和模板推荐。
+        在工作线程中执行，输出先收集起来，由主线程整段打印，避免多个文档的输出交错
+        """
+        logger.info(f"开始处理文档: {input_file}")
+        
+        lines = []
+        content, file_type = self._load_and_report(input_file, lines.append)
+        if content is None:
+            return False, lines
+        
+        return self._run_flow(content, file_type, instruction, output_format, emit=lines.append), lines
+
+    def _load_and_report(self, input_file: str,
+                         emit: Callable[[str], None] = print) -> tuple[Optional[str], Optional[str]]:
+        """加载文档并输出文件名和长度"""
+        content, file_type = self.load_document_from_file(input_file)
+        if content is not None:
+            char_len = len(content)
+            emit(f"📄 加载文档: {Path(input_file).name}")
+            emit(f"📏 文档长度: {char_len}字符")
+            logger.info(f"已加载文档 {input_file}: {char_len}字符")
+        return content, file_type
+
+    def _run_flow(self, content: str, file_type: str, instruction: str, output_format: str,
+                  shared_extras: Optional[Dict[str, Any]] = None,
+                  emit: Callable[[str], None] = print) -> bool:
+        """运行工作流并保存结果，进度信息通过 emit 输出"""
         # 创建共享数据
         shared_data = {
             "user_instruction": instruction,
             "original_document": content,
             "file_type": file_type,
-            "output_format": output_format,
-            "analysis_result": analysis_result,
-            "template_recommendations": template_recommendations
+            "output_format": output_format
         }
+        if shared_extras:
+            shared_data.update(shared_extras)
         
         try:
             # 选择处理流程
-            if len(instruction.split()) > 50:  # 复杂指令使用完整流程
-                flow = get_flow_by_type("complete")
+            if _is_complex_instruction(instruction):  # 复杂指令使用完整流程
+                flow = _get_flow("complete")
             else:  # 简单指令使用快速流程
-                flow = get_flow_by_type("quick")
+                flow = _get_flow("quick")
             
-            print(f"\n🚀 开始处理文档...")
-            print(f"📝 指令: {instruction}")
-            print(f"📄 输出格式: {output_format}")
+            emit(f"\n🚀 开始处理文档...")
+            emit(f"📝 指令: {instruction}")
+            emit(f"📄 输出格式: {output_format}")
             
             # 运行流程
             flow.run(shared_data)
             
             if "final_document" in shared_data:
-                print("✅ 文档处理完成!")
+                emit("✅ 文档处理完成!")
                 
                 # 使用格式转换器保存文档
                 final_doc = shared_data["final_document"]
-                if "content" in final_doc and NEW_FEATURES_AVAILABLE and self.format_converter:
+                if "content" in final_doc and self.format_converter:
                     result = self.format_converter.convert_to_format(
                         final_doc["content"], 
                         output_format,
@@ -216,25 +440,26 @@ class DocumentProcessorApp:
                     )
                     
                     if result.get("success"):
-                        print(f"💾 文件已保存: {result['file_path']}")
-                        print(f"📊 文件大小: {result.get('size', 0)} 字节")
+                        emit(f"💾 文件已保存: {result['file_path']}")
+                        emit(f"📊 文件大小: {result.get('size', 0)} 字节")
                     else:
-                        print(f"❌ 保存失败: {result.get('error', '未知错误')}")
+                        emit(f"❌ 保存失败: {result.get('error', '未知错误')}")
                 else:
-                    print(f"💾 文档已保存到 output/ 目录")
+                    emit(f"💾 文档已保存到 output/ 目录")
                 
                 return True
             else:
-                print("❌ 文档处理失败")
+                emit("❌ 文档处理失败")
                 return False
                 
         except Exception as e:
             logger.error(f"处理过程中发生错误: {e}")
-            print(f"❌ 处理错误: {e}")
+            emit(f"❌ 处理错误: {e}")
             return False
 
-    def process_batch_documents(self, input_dir: str, output_dir: str, instruction: str) -> bool:
-        """批量处理文档"""
+    def process_batch_documents(self, input_dir: str, output_dir: str, instruction: str,
+                                max_workers: Optional[int] = None) -> bool:
+        """批量处理文档（文档之间互不依赖，使用线程池并发等待LLM响应）"""
         input_path = Path(input_dir)
         output_path = Path(output_dir)
         
@@ -244,81 +469,105 @@ class DocumentProcessorApp:
         
         output_path.mkdir(parents=True, exist_ok=True)
         
-        # 查找所有支持的文档文件
-        supported_extensions = ['.md', '.txt', '.markdown']
-        files = []
-        for ext in supported_extensions:
-            files.extend(input_path.glob(f"*{ext}"))
+        # 与标准库线程池默认值一致：适合以等待I/O为主的任务
+        workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        print(f"📁 开始扫描并处理文档 (并发数: {workers})")
         
-        if not files:
+        total = 0
+        success_count = 0
+        pending = {}
+        
+        def report(finished):
+            # 进度信息只在主线程输出，避免多线程打印交错
+            nonlocal success_count
+            for future in finished:
+                file_path = pending.pop(future)
+                try:
+                    ok, lines = future.result()
+                    if lines:
+                        sys.stdout.write('\n'.join(lines) + '\n')
+                    if ok:
+                        success_count += 1
+                        print(f"\n✅ 成功: {file_path.name}")
+                    else:
+                        print(f"\n❌ 失败: {file_path.name}")
+                except Exception as e:
+                    logger.error(f"处理文件 {file_path} 时发生错误: {e}")
+                    print(f"\n❌ 错误: {file_path.name} - {e}")
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # 边扫描边提交，第一个文件无需等待目录遍历完成即可开始处理；
+            # 在途任务数限制为并发数的2倍，避免超大目录一次性占用内存
+            for file_path in _iter_document_files(input_path):
+                if len(pending) >= workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    report(done)
+                # 批量处理时跳过分析和模板推荐以提高速度
+                future = executor.submit(self._process_batch_file, str(file_path), instruction)
+                pending[future] = file_path
+                total += 1
+            
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                report(done)
+        
+        if total == 0:
             logger.warning("未找到支持的文档文件")
             return False
         
-        print(f"📁 找到 {len(files)} 个文档文件")
-        
-        success_count = 0
-        for i, file_path in enumerate(files, 1):
-            try:
-                print(f"\n📄 处理文件 {i}/{len(files)}: {file_path.name}")
-                if self.process_single_document(
-                    str(file_path), 
-                    instruction, 
-                    enable_analysis=False,  # 批量处理时关闭分析以提高速度
-                    enable_template_recommendation=False
-                ):
-                    success_count += 1
-                    print(f"✅ 成功")
-                else:
-                    print(f"❌ 失败")
-            except Exception as e:
-                logger.error(f"处理文件 {file_path} 时发生错误: {e}")
-                print(f"❌ 错误: {e}")
-        
-        print(f"\n📊 批量处理完成: {success_count}/{len(files)} 个文件成功")
+        print(f"\n📊 批量处理完成: {success_count}/{total} 个文件成功")
         return success_count > 0
 
     def show_format_info(self):
         """显示支持的格式信息"""
-        if not NEW_FEATURES_AVAILABLE or not self.format_converter:
-            print("\n📋 支持的输出格式:")
-            print("-" * 50)
-            print("✅ HTML: 基础HTML输出")
-            print("❌ 其他格式需要安装额外依赖")
+        buf = []
+        if not self.format_converter:
+            buf.append("\n📋 支持的输出格式:")
+            buf.append("-" * 50)
+            buf.append("✅ HTML: 基础HTML输出")
+            buf.append("❌ 其他格式需要安装额外依赖")
+            sys.stdout.write('\n'.join(buf) + '\n')
             return
             
         formats_info = self.format_converter.get_available_formats()
         
-        print("\n📋 支持的输出格式:")
-        print("-" * 50)
+        buf.append("\n📋 支持的输出格式:")
+        buf.append("-" * 50)
         for fmt, info in formats_info.items():
             status = "✅" if info["available"] else "❌"
-            print(f"{status} {fmt}: {info['description']}")
+            buf.append(f"{status} {fmt}: {info['description']}")
             if info.get("requirements"):
-                print(f"   💡 需要安装: {info['requirements']}")
-        print()
+                buf.append(f"   💡 需要安装: {info['requirements']}")
+        buf.append("")
+        sys.stdout.write('\n'.join(buf) + '\n')
 
     def show_template_info(self):
         """显示模板信息"""
-        if not NEW_FEATURES_AVAILABLE or not self.template_manager:
+        if not self.template_manager:
             print("\n📚 模板功能需要安装额外依赖")
             return
             
         templates = self.template_manager.list_templates()
-        categories = self.template_manager.get_categories()
-        
-        print(f"\n📚 可用模板 ({len(templates)}个):")
-        print("-" * 50)
-        
-        for category in categories:
-            category_templates = [t for t in templates if t.category == category]
-            if category_templates:
-                print(f"\n🏷️  {category} ({len(category_templates)}个):")
-                for template in category_templates:
-                    usage_indicator = "🔥" if template.usage_count > 10 else "📝"
-                    rating_indicator = "⭐" if template.rating > 4.0 else ""
-                    print(f"   {usage_indicator} {template.name} {rating_indicator}")
-                    print(f"      {template.description}")
-        print()
+        
+        # 一次遍历按分类分组（组内保持按使用次数排序），不再对每个分类重新扫描全部模板
+        by_category = {}
+        for template in templates:
+            by_category.setdefault(template.category, []).append(template)
+        
+        buf = []
+        buf.append(f"\n📚 可用模板 ({len(templates)}个):")
+        buf.append("-" * 50)
+        
+        for category in sorted(by_category):
+            category_templates = by_category[category]
+            buf.append(f"\n🏷️  {category} ({len(category_templates)}个):")
+            for template in category_templates:
+                usage_indicator = "🔥" if template.usage_count > 10 else "📝"
+                rating_indicator = "⭐" if template.rating > 4.0 else ""
+                buf.append(f"   {usage_indicator} {template.name} {rating_indicator}")
+                buf.append(f"      {template.description}")
+        buf.append("")
+        sys.stdout.write('\n'.join(buf) + '\n')
 
     def interactive_mode(self):
         """简化的交互模式"""
@@ -363,18 +612,11 @@ class DocumentProcessorApp:
         
         elif choice == "2":
             # 直接输入内容
-            print("📝 请粘贴您的文档内容（输入'END'结束）:")
-            lines = []
-            while True:
-                line = input()
-                if line.strip().upper() == 'END':
-                    break
-                lines.append(line)
-            document_content = '\n'.join(lines)
+            document_content = read_pasted_content("📝 请粘贴您的文档内容（按 Ctrl-D 结束，Windows 下按 Ctrl-Z 后回车）:")
         
         elif choice == "3":
             # 使用示例文档
-            document_content = get_example_document()
+            document_content = _EXAMPLE_DOCUMENT
             print("✓ 使用示例文档")
         
         else:
@@ -401,11 +643,12 @@ class DocumentProcessorApp:
         
         try:
             # 获取对应的工作流
-            flow = get_flow_by_type(flow_type)
+            flow = _get_flow(flow_type)
+            char_len = len(document_content)
             
             logger.info(f"开始执行{flow_type}工作流")
             logger.info(f"用户需求: {user_instruction}")
-            logger.info(f"文档长度: {len(document_content)}字符")
+            logger.info(f"文档长度: {char_len}字符")
             
             # 运行工作流
             flow.run(shared)
@@ -457,6 +700,7 @@ class DocumentProcessorApp:
         print("  • -i, --instruction 格式化指令")
         print("  • -o, --output      输出格式 (HTML/PDF/DOCX/PPTX/MARKDOWN)")
         print("  • -b, --batch       批量处理 (输入目录 输出目录)")
+        print("  • -w, --workers     批量处理并发数")
         print("  • --analysis        启用文档分析")
         print("  • --templates       启用模板推荐")
         print("  • --formats         显示支持的格式")
@@ -468,9 +712,8 @@ class DocumentProcessorApp:
         print("  • 模板推荐可大幅提升效果")
         print("  • 支持多种专业格式输出")
 
-def get_example_document():
-    """获取示例文档"""
-    return """
+# 示例文档（交互模式中“使用示例文档”选项）
+_EXAMPLE_DOCUMENT = """
 # 智能科技产品介绍
 
 ## 产品概述
@@ -516,6 +759,10 @@ def get_example_document():
 🌐 官网: www.example.com
 """
 
+def get_example_document():
+    """获取示例文档"""
+    return _EXAMPLE_DOCUMENT
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(
@@ -529,6 +776,8 @@ def main():
                        help='输出格式')
     parser.add_argument('-b', '--batch', nargs=2, metavar=('INPUT_DIR', 'OUTPUT_DIR'),
                        help='批量处理模式')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                       help='批量处理并发数 (默认: min(32, CPU核数+4))')
     parser.add_argument('--analysis', action='store_true', help='启用文档分析')
     parser.add_argument('--templates', action='store_true', help='启用模板推荐')
     parser.add_argument('--formats', action='store_true', help='显示支持的格式')
@@ -537,6 +786,18 @@ def main():
     
     args = parser.parse_args()
     
+    # 创建应用实例（组件均为按需创建）
+    app = DocumentProcessorApp()
+    
+    # 仅查看信息的选项优先处理，无需环境检查和工作流加载
+    if args.formats:
+        app.show_format_info()
+        return
+    
+    if args.template_info:
+        app.show_template_info()
+        return
+    
     # 检查环境
     if not os.getenv('OPENAI_API_KEY'):
         print("⚠️  警告: 未设置 OPENAI_API_KEY 环境变量")
@@ -544,23 +805,10 @@ def main():
         print("   设置方法: export OPENAI_API_KEY='your-api-key-here'")
         print()
     
-    # 创建应用实例
-    app = DocumentProcessorApp()
-    
     try:
-        # 显示格式信息
-        if args.formats:
-            app.show_format_info()
-            return
-        
-        # 显示模板信息
-        if args.template_info:
-            app.show_template_info()
-            return
-        
         # 使用增强交互模式
-        if args.enhanced and NEW_FEATURES_AVAILABLE:
-            ui = InteractiveUI()
+        if args.enhanced and _import_feature("interactive_ui") is not None:
+            ui = _import_feature("interactive_ui").InteractiveUI()
             ui.run()
             return
         
@@ -572,7 +820,8 @@ def main():
                 print("   示例: python main.py -b input/ output/ -i '现代商务风格'")
                 return
             
-            success = app.process_batch_documents(input_dir, output_dir, args.instruction)
+            success = app.process_batch_documents(input_dir, output_dir, args.instruction,
+                                                  max_workers=args.workers)
             if success:
                 print("✅ 批量处理完成")
             else:
@@ -594,9 +843,10 @@ def main():
                 
         # 默认交互模式
         else:
-            if NEW_FEATURES_AVAILABLE:
+            ui_module = _import_feature("interactive_ui")
+            if ui_module is not None:
                 print("🎨 启动增强交互模式...")
-                ui = InteractiveUI()
+                ui = ui_module.InteractiveUI()
                 ui.run()
             else:
                 print("🎨 启动基础交互模式...")
@@ -9,17 +9,21 @@
 import os
 import sys
 import argparse
-import json
-from pathlib import Path
+from importlib.util import find_spec
+from utils.version_info import get_version_info
+
+_BANNER_TEXT = (
+    "============================================================\n"
+    "🎨 智能文档自动排版系统 v1.0.0\n"
+    "============================================================\n"
+    "基于 PocketFlow 框架的智能文档处理系统\n"
+    "支持一句话完成文档格式化、排版和图片统一\n"
+    "\n"
+)
 
 def show_banner():
     """显示程序横幅"""
-    print("=" * 60)
-    print("🎨 智能文档自动排版系统 v1.0.0")
-    print("=" * 60)
-    print("基于 PocketFlow 框架的智能文档处理系统")
-    print("支持一句话完成文档格式化、排版和图片统一")
-    print()
+    sys.stdout.write(_BANNER_TEXT)
 
 def check_environment():
     """检查运行环境"""
@@ -42,85 +46,109 @@ def check_environment():
         print("⚠️  OpenAI API密钥未设置")
         print("请设置OPENAI_API_KEY环境变量")
     
-    # 检查PocketFlow
-    try:
-        import pocketflow
+    # 检查PocketFlow（只查找模块，不执行导入）
+    if find_spec('pocketflow') is not None:
         print(f"✅ PocketFlow框架: 已安装")
-    except ImportError:
+    else:
         print("❌ PocketFlow框架未安装")
         print("请运行: pip install pocketflow")
         return False
     
     return True
 
-def get_version_info():
-    """获取版本信息"""
-    try:
-        with open('version.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {
-            "version": "1.0.0",
-            "description": "智能文档自动排版系统",
-            "release_date": "2024-12-28"
-        }
+_FEATURES_TEXT = (
+    "✨ 功能特色:\n"
+    "--------------------------------------------------\n"
+    "🗣️  自然语言交互: 用一句话描述需求，AI自动理解并执行\n"
+    "🎨 智能排版设计: 自动分析文档结构，生成专业的排版方案\n"
+    "🖼️  图片统一处理: 自动调整图片尺寸、添加效果、统一风格\n"
+    "📄 多格式输出: 支持HTML、PDF、Word、PowerPoint、Markdown\n"
+    "📊 智能内容分析: 自动分析文档质量，提供优化建议\n"
+    "🎯 模板智能推荐: 基于内容特征推荐最适合的排版模板\n"
+    "⚡ 批量处理: 支持批量处理多个文档\n"
+    "🔄 实时预览调整: 交互式调整和预览功能\n"
+    "\n"
+)
 
 def show_features():
     """显示功能特色"""
-    print("✨ 功能特色:")
-    print("-" * 50)
-    print("🗣️  自然语言交互: 用一句话描述需求，AI自动理解并执行")
-    print("🎨 智能排版设计: 自动分析文档结构，生成专业的排版方案")
-    print("🖼️  图片统一处理: 自动调整图片尺寸、添加效果、统一风格")
-    print("📄 多格式输出: 支持HTML、PDF、Word、PowerPoint、Markdown")
-    print("📊 智能内容分析: 自动分析文档质量，提供优化建议")
-    print("🎯 模板智能推荐: 基于内容特征推荐最适合的排版模板")
-    print("⚡ 批量处理: 支持批量处理多个文档")
-    print("🔄 实时预览调整: 交互式调整和预览功能")
-    print()
+    sys.stdout.write(_FEATURES_TEXT)
+
+_EXAMPLES_TEXT = (
+    "📖 使用示例:\n"
+    "--------------------------------------------------\n"
+    "• '转换为现代商务风格的HTML文档，图片加圆角边框'\n"
+    "• '生成学术论文格式的PDF，使用蓝白配色'\n"
+    "• '制作创意设计文档，图片添加阴影效果'\n"
+    "• '将报告转换为PowerPoint演示文稿'\n"
+    "• '优化文档结构，提升可读性'\n"
+    "\n"
+)
 
 def show_examples():
     """显示使用示例"""
-    print("📖 使用示例:")
-    print("-" * 50)
-    print("• '转换为现代商务风格的HTML文档，图片加圆角边框'")
-    print("• '生成学术论文格式的PDF，使用蓝白配色'")
-    print("• '制作创意设计文档，图片添加阴影效果'")
-    print("• '将报告转换为PowerPoint演示文稿'")
-    print("• '优化文档结构，提升可读性'")
-    print()
+    sys.stdout.write(_EXAMPLES_TEXT)
+
+_FORMATS_TEXT = (
+    "📋 支持的格式:\n"
+    "--------------------------------------------------\n"
+    "📥 输入格式:\n"
+    "   • Markdown (.md, .markdown)\n"
+    "   • 纯文本 (.txt)\n"
+    "\n"
+    "📤 输出格式:\n"
+    "   • HTML: 响应式网页格式\n"
+    "   • PDF: 高质量文档格式\n"
+    "   • DOCX: Microsoft Word格式\n"
+    "   • PPTX: PowerPoint演示文稿\n"
+    "   • Markdown: 优化后的Markdown\n"
+    "\n"
+)
 
 def show_supported_formats():
     """显示支持的格式"""
-    print("📋 支持的格式:")
-    print("-" * 50)
-    print("📥 输入格式:")
-    print("   • Markdown (.md, .markdown)")
-    print("   • 纯文本 (.txt)")
-    print()
-    print("📤 输出格式:")
-    print("   • HTML: 响应式网页格式")
-    print("   • PDF: 高质量文档格式")
-    print("   • DOCX: Microsoft Word格式")
-    print("   • PPTX: PowerPoint演示文稿")
-    print("   • Markdown: 优化后的Markdown")
-    print()
+    sys.stdout.write(_FORMATS_TEXT)
+
+_MENU_TEXT = (
+    "请选择操作:\n"
+    "1. 🚀 开始使用（需要完整版）\n"
+    "2. 📋 查看支持格式\n"
+    "3. 📖 查看使用示例\n"
+    "4. ℹ️  查看版本信息\n"
+    "5. 🔧 检查环境\n"
+    "0. 退出\n"
+)
 
 def get_user_input():
     """获取用户输入"""
-    print("请选择操作:")
-    print("1. 🚀 开始使用（需要完整版）")
-    print("2. 📋 查看支持格式")
-    print("3. 📖 查看使用示例")
-    print("4. ℹ️  查看版本信息")
-    print("5. 🔧 检查环境")
-    print("0. 退出")
+    sys.stdout.write(_MENU_TEXT)
     
     choice = input("\n请输入选择 (0-5): ").strip()
     return choice
 
+def show_version():
+    """显示版本信息"""
+    version_info = get_version_info()
+    print(f"智能文档自动排版系统 v{version_info['version']}")
+    print(f"发布日期: {version_info.get('release_date', 'Unknown')}")
+    print(f"描述: {version_info.get('description', '')}")
+
+# 只带单个信息选项时直接分派，无需构建 argparse 解析器
+_TRIVIAL_FLAGS = {
+    '--version': show_version,
+    '--check': check_environment,
+    '--formats': show_supported_formats,
+    '--examples': show_examples,
+    '--features': show_features,
+}
+
 def main():
     """主函数"""
+    argv = sys.argv[1:]
+    if len(argv) == 1 and argv[0] in _TRIVIAL_FLAGS:
+        _TRIVIAL_FLAGS[argv[0]]()
+        return
+    
     parser = argparse.ArgumentParser(
         description='智能文档自动排版系统',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -146,10 +174,7 @@ def main():
     
     # 处理命令行参数
     if args.version:
-        version_info = get_version_info()
-        print(f"智能文档自动排版系统 v{version_info['version']}")
-        print(f"发布日期: {version_info.get('release_date', 'Unknown')}")
-        print(f"描述: {version_info.get('description', '')}")
+        show_version()
         return
     
     if args.check:
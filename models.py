@@ -0,0 +1,85 @@
+"""
+工作流共享数据的结构化模型
+排版方案在节点间以带 __slots__ 的 dataclass 传递：字段访问是直接的槽位读取，不再逐层 dict.get 并构造空字典默认值。
+LLM未给出的字段为 None；需要写入结果或生成CSS时用 to_dict() 转回只含已设置字段的字典。
+"""
+
+import sys
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Optional
+
+# slots=True 需要 Python 3.10+，更早的版本退化为普通 dataclass
+_slotted = dataclass(slots=True) if sys.version_info >= (3, 10) else dataclass
+
+def _to_dict(obj) -> Dict[str, Any]:
+    """转为字典，省略值为 None 的字段和空的嵌套模型"""
+    result = {}
+    for f in fields(obj):
+        value = getattr(obj, f.name)
+        if hasattr(value, "to_dict"):
+            value = value.to_dict() or None
+        if value is not None:
+            result[f.name] = value
+    return result
+
+def _from_dict(cls, data):
+    """从字典构造模型，忽略未知字段；data 不是字典时返回全部为默认值的模型"""
+    if not isinstance(data, dict):
+        return cls()
+    return cls(**{f.name: data[f.name] for f in fields(cls) if f.name in data})
+
+@_slotted
+class Typography:
+    primary_font: Optional[str] = None
+    heading_sizes: Optional[Dict[str, str]] = None
+    line_height: Optional[str] = None
+    letter_spacing: Optional[str] = None
+
+    to_dict = _to_dict
+
+@_slotted
+class Colors:
+    primary: Optional[str] = None
+    secondary: Optional[str] = None
+    text: Optional[str] = None
+    background: Optional[str] = None
+
+    to_dict = _to_dict
+
+@_slotted
+class Spacing:
+    section_margin: Optional[str] = None
+    paragraph_margin: Optional[str] = None
+    title_margin: Optional[str] = None
+
+    to_dict = _to_dict
+
+@_slotted
+class ImageDesign:
+    max_width: Optional[str] = None
+    border_radius: Optional[str] = None
+    shadow: Optional[str] = None
+    border: Optional[str] = None
+
+    to_dict = _to_dict
+
+@_slotted
+class LayoutDesign:
+    typography: Typography = field(default_factory=Typography)
+    colors: Colors = field(default_factory=Colors)
+    spacing: Spacing = field(default_factory=Spacing)
+    image_design: ImageDesign = field(default_factory=ImageDesign)
+
+    to_dict = _to_dict
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LayoutDesign":
+        """从LLM返回（或默认）的排版方案字典构造"""
+        if not isinstance(data, dict):
+            data = {}
+        return cls(
+            typography=_from_dict(Typography, data.get("typography")),
+            colors=_from_dict(Colors, data.get("colors")),
+            spacing=_from_dict(Spacing, data.get("spacing")),
+            image_design=_from_dict(ImageDesign, data.get("image_design")),
+        )
@@ -1,32 +1,70 @@
 from pocketflow import Node
-from utils.call_llm import call_llm, analyze_with_llm, generate_with_llm
+from utils.call_llm import call_llm, generate_with_llm, build_analysis_prompt, call_llm_batch, llm_cache_enabled
 from utils.document_processor import parse_document, apply_styles, generate_html_from_markdown
 from utils.image_processor import process_image_with_effects, batch_process_images
-import json
+from utils import fast_json
+from utils.llm_schemas import REQUIREMENTS_DECODER, LAYOUT_DESIGN_DECODER
+from models import LayoutDesign
 import yaml
 import os
 import logging
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class ParseRequirementNode(Node):
-    """解析用户需求节点"""
-    
-    def prep(self, shared):
-        """准备用户指令数据"""
-        return shared.get("user_instruction", "")
-    
-    def exec(self, prep_res):
-        """使用LLM解析用户需求"""
-        if not prep_res:
-            return {"error": "没有提供用户指令"}
-        
-        prompt = f"""
+# 输出文件的写缓冲大小，也是分段写入的片段长度
+WRITE_BUFFER_SIZE = 1 << 20
+
+# 文档结构良好（至少有这么多级标题、段落平均长度不超过上限）时跳过LLM文本优化
+MIN_HEADING_LEVELS = 2
+MAX_AVG_PARAGRAPH_LEN = 500
+
+def _is_well_structured(doc_structure):
+    """根据已解析的文档结构判断是否已有清晰的标题层次和合理的段落长度"""
+    if len({title["level"] for title in doc_structure.get("titles", [])}) < MIN_HEADING_LEVELS:
+        return False
+    paragraphs = doc_structure.get("paragraphs", [])
+    if not paragraphs:
+        return True
+    return sum(len(p["text"]) for p in paragraphs) / len(paragraphs) <= MAX_AVG_PARAGRAPH_LEN
+
+# 文档分析结果的进程内缓存：同一文档（例如几秒前刚处理过）再次分析时直接复用结构解析和LLM分析
+ANALYSIS_CACHE_SIZE = 256
+_analysis_cache = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+
+def _document_digest(content, file_type):
+    return hashlib.blake2b(f"{file_type}\0{content}".encode("utf-8"), digest_size=16).hexdigest()
+
+def _get_cached_analysis(digest):
+    with _analysis_cache_lock:
+        result = _analysis_cache.get(digest)
+        if result is not None:
+            _analysis_cache.move_to_end(digest)
+    return result
+
+def _store_analysis(digest, result):
+    with _analysis_cache_lock:
+        _analysis_cache[digest] = result
+        _analysis_cache.move_to_end(digest)
+        if len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+
+def _iter_chunks(text, size):
+    """按固定长度切分文本"""
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+# 提示词模板（str.format格式）：模块加载时构建一次，修改模板后需递增 utils.call_llm.PROMPT_VERSION 使LLM缓存失效
+_PARSE_REQUIREMENT_PROMPT = """
 作为专业的文档设计师，请分析用户的以下指令，并提取出具体的格式要求：
 
-用户指令："{prep_res}"
+用户指令："{instruction}"
 
 请分析并返回以下信息（JSON格式）：
 {{
@@ -47,19 +85,91 @@ class ParseRequirementNode(Node):
 
 如果用户指令比较简单，请根据常见的设计原则补充合理的默认设置。
 """
+
+_DESIGN_LAYOUT_PROMPT = """
+作为专业的UI/UX设计师，根据以下信息设计文档排版方案：
+
+用户需求：
+- 风格：{style}
+- 格式：{output_format}
+- 特殊要求：{special_requirements}
+
+文档结构：
+- 标题层级：{title_count}个标题
+- 图片数量：{image_count}张图片
+- 段落数量：{paragraph_count}个段落
+
+请设计详细的排版方案，包括：
+{{
+    "typography": {{
+        "primary_font": "主要字体",
+        "heading_sizes": {{"h1": "2.5em", "h2": "2em", "h3": "1.5em"}},
+        "line_height": "行高",
+        "letter_spacing": "字间距"
+    }},
+    "colors": {{
+        "primary": "主色调",
+        "secondary": "辅助色",
+        "text": "文字颜色",
+        "background": "背景色"
+    }},
+    "spacing": {{
+        "section_margin": "段落间距",
+        "paragraph_margin": "段落内间距",
+        "title_margin": "标题间距"
+    }},
+    "image_design": {{
+        "max_width": "图片最大宽度",
+        "border_radius": "圆角大小",
+        "shadow": "阴影效果",
+        "border": "边框样式"
+    }}
+}}
+
+请返回JSON格式的完整设计方案。
+"""
+
+_OPTIMIZE_TEXT_PROMPT = """
+请优化以下文档的文本结构和格式：
+
+原始内容：
+{content}
+
+优化要求：
+1. 确保标题层次清晰
+2. 段落结构合理
+3. 添加必要的分隔和强调
+4. 保持原始内容的完整性
+
+请返回优化后的Markdown格式文档。
+"""
+
+class ParseRequirementNode(Node):
+    """解析用户需求节点"""
+    
+    def prep(self, shared):
+        """准备用户指令数据"""
+        return shared.get("user_instruction", "")
+    
+    def build_prompt(self, prep_res):
+        """构建需求解析提示词，无需调用LLM时返回None"""
+        if not prep_res:
+            return None
         
-        result = call_llm(prompt)
+        return _PARSE_REQUIREMENT_PROMPT.format(instruction=prep_res)
+    
+    def parse_response(self, prep_res, result):
+        """把LLM返回解析为需求字典"""
+        if not prep_res:
+            return {"error": "没有提供用户指令"}
+        if result is None:
+            result = ""
         
         try:
             # 尝试解析JSON
-            if "```json" in result:
-                json_str = result.split("```json")[1].split("```")[0].strip()
-            else:
-                json_str = result
-            
-            parsed_requirements = json.loads(json_str)
+            parsed_requirements = REQUIREMENTS_DECODER.decode(result)
             return parsed_requirements
-        except json.JSONDecodeError:
+        except fast_json.JSONDecodeError:
             # 如果JSON解析失败，返回基本的默认设置
             logger.warning("无法解析LLM返回的JSON，使用默认设置")
             return {
@@ -78,70 +188,140 @@ class ParseRequirementNode(Node):
                 "special_requirements": prep_res
             }
     
+    def exec(self, prep_res):
+        """使用LLM解析用户需求"""
+        prompt = self.build_prompt(prep_res)
+        return self.parse_response(prep_res, call_llm(prompt) if prompt else None)
+    
     def post(self, shared, prep_res, exec_res):
         """保存解析结果"""
         shared["requirements"] = exec_res
-        logger.info(f"需求解析完成: {exec_res.get('style', 'Unknown')}风格")
+        logger.info("需求解析完成: %s风格", exec_res.get('style', 'Unknown'))
         return "default"
 
+def _semantic_cache():
+    """
+    启用LLM缓存时返回语义缓存，否则返回None；
+    按需导入，加载 nodes/flow 时不会导入向量检索依赖（sentence-transformers、faiss 等）
+    """
+    if not llm_cache_enabled():
+        return None
+    from utils.semantic_cache import get_semantic_cache
+    return get_semantic_cache()
+
 class AnalyzeDocumentNode(Node):
     """文档分析节点"""
     
     def prep(self, shared):
-        """准备文档内容"""
-        return {
-            "content": shared.get("original_document", ""),
-            "file_type": shared.get("file_type", "markdown")
-        }
+        """准备文档内容，并查找同一文档或近似文档的缓存分析结果"""
+        content = shared.get("original_document", "")
+        file_type = shared.get("file_type", "markdown")
+        prep_res = {"content": content, "file_type": file_type}
+        if content:
+            prep_res["digest"] = _document_digest(content, file_type)
+            prep_res["cached_result"] = _get_cached_analysis(prep_res["digest"])
+            semantic_cache = _semantic_cache() if prep_res["cached_result"] is None else None
+            if semantic_cache is not None:
+                prep_res["cached_analysis"] = semantic_cache.lookup(content[:1000])
+        return prep_res
     
-    def exec(self, prep_res):
-        """分析文档结构"""
+    def build_prompt(self, prep_res):
+        """构建文档分析提示词，无需调用LLM时返回None"""
+        content = prep_res["content"]
+        if not content or prep_res.get("cached_result") is not None or prep_res.get("cached_analysis") is not None:
+            return None
+        return build_analysis_prompt(content[:1000], "分析文档结构和排版建议")
+    
+    def parse_response(self, prep_res, llm_analysis):
+        """合并本地结构解析与LLM分析结果"""
         content = prep_res["content"]
-        file_type = prep_res["file_type"]
-        
         if not content:
             return {"error": "没有提供文档内容"}
         
-        # 使用文档处理器解析结构
-        document_structure = parse_document(content, file_type)
+        # 同一文档已分析过：返回副本，避免下游修改影响缓存
+        if prep_res.get("cached_result") is not None:
+            return dict(prep_res["cached_result"])
         
-        # 使用LLM进行更深入的分析
-        analysis_prompt = f"""
-请分析以下文档结构，并提供优化建议：
-
-文档类型：{file_type}
-标题数量：{len(document_structure.get('titles', []))}
-段落数量：{len(document_structure.get('paragraphs', []))}
-图片数量：{len(document_structure.get('images', []))}
-
-文档内容摘要：
-{content[:500]}...
-
-请分析文档的：
-1. 结构层次是否清晰
-2. 内容组织是否合理
-3. 建议的排版改进点
-
-返回JSON格式的分析结果。
-"""
+        # 使用文档处理器解析结构
+        document_structure = parse_document(content, prep_res["file_type"])
         
-        llm_analysis = analyze_with_llm(content[:1000], "分析文档结构和排版建议")
+        if llm_analysis is None:
+            llm_analysis = prep_res.get("cached_analysis")
+        elif not llm_analysis.startswith("错误: "):
+            semantic_cache = _semantic_cache()
+            if semantic_cache is not None:
+                semantic_cache.add(content[:1000], llm_analysis)
         
         # 合并结构信息和LLM分析
-        document_structure["llm_analysis"] = llm_analysis
+        document_structure["llm_analysis"] = llm_analysis or ""
+        
+        # LLM调用失败的结果不缓存，下次重新分析
+        if llm_analysis and not llm_analysis.startswith("错误: "):
+            _store_analysis(prep_res["digest"], dict(document_structure))
         
         return document_structure
     
+    def exec(self, prep_res):
+        """分析文档结构"""
+        prompt = self.build_prompt(prep_res)
+        return self.parse_response(prep_res, call_llm(prompt) if prompt else None)
+    
     def post(self, shared, prep_res, exec_res):
         """保存文档分析结果"""
         shared["document_structure"] = exec_res
         
-        titles_count = len(exec_res.get("titles", []))
-        images_count = len(exec_res.get("images", []))
-        logger.info(f"文档分析完成: {titles_count}个标题, {images_count}张图片")
+        if logger.isEnabledFor(logging.INFO):
+            titles_count = len(exec_res.get("titles", []))
+            images_count = len(exec_res.get("images", []))
+            logger.info("文档分析完成: %d个标题, %d张图片", titles_count, images_count)
         
         return "default"
 
+class BatchedLLMNode(Node):
+    """批量LLM节点：把多个互不依赖节点的提示词合并为一次LLM调用
+    
+    被包装的节点需提供build_prompt(prep_res)和parse_response(prep_res, response)，
+    prep/post仍按原顺序逐个执行，因此共享数据的读写方式不变。
+    """
+    
+    def __init__(self, nodes, max_retries=1, wait=0):
+        super().__init__(max_retries=max_retries, wait=wait)
+        self.nodes = nodes
+    
+    def prep(self, shared):
+        """依次收集各节点的准备数据"""
+        return [node.prep(shared) for node in self.nodes]
+    
+    def exec(self, prep_res):
+        """合并提示词，调用一次LLM并按索引拆分结果"""
+        prompts = [node.build_prompt(p) for node, p in zip(self.nodes, prep_res)]
+        pending = [i for i, prompt in enumerate(prompts) if prompt]
+        
+        responses = [None] * len(prompts)
+        if len(pending) == 1:
+            responses[pending[0]] = call_llm(prompts[pending[0]])
+        elif pending:
+            batched = call_llm_batch([prompts[i] for i in pending])
+            for i, response in zip(pending, batched):
+                responses[i] = response
+            # 批量结果缺失的项回退为单独调用该节点的提示词，多项时并发请求
+            missing = [i for i in pending if responses[i] is None]
+            if len(missing) == 1:
+                responses[missing[0]] = call_llm(prompts[missing[0]])
+            elif missing:
+                with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                    for i, response in zip(missing, executor.map(call_llm, (prompts[i] for i in missing))):
+                        responses[i] = response
+        
+        return [node.parse_response(p, r) for node, p, r in zip(self.nodes, prep_res, responses)]
+    
+    def post(self, shared, prep_res, exec_res):
+        """依次执行各节点的后处理，返回最后一个节点的action"""
+        action = "default"
+        for node, p, r in zip(self.nodes, prep_res, exec_res):
+            action = node.post(shared, p, r)
+        return action
+
 class DesignLayoutNode(Node):
     """排版设计节点"""
     
@@ -157,63 +337,23 @@ class DesignLayoutNode(Node):
         requirements = prep_res["requirements"]
         doc_structure = prep_res["document_structure"]
         
-        design_prompt = f"""
-作为专业的UI/UX设计师，根据以下信息设计文档排版方案：
-
-用户需求：
-- 风格：{requirements.get('style', '现代简约')}
-- 格式：{requirements.get('format', 'HTML')}
-- 特殊要求：{requirements.get('special_requirements', '无')}
-
-文档结构：
-- 标题层级：{len(doc_structure.get('titles', []))}个标题
-- 图片数量：{len(doc_structure.get('images', []))}张图片
-- 段落数量：{len(doc_structure.get('paragraphs', []))}个段落
-
-请设计详细的排版方案，包括：
-{{
-    "typography": {{
-        "primary_font": "主要字体",
-        "heading_sizes": {{"h1": "2.5em", "h2": "2em", "h3": "1.5em"}},
-        "line_height": "行高",
-        "letter_spacing": "字间距"
-    }},
-    "colors": {{
-        "primary": "主色调",
-        "secondary": "辅助色",
-        "text": "文字颜色",
-        "background": "背景色"
-    }},
-    "spacing": {{
-        "section_margin": "段落间距",
-        "paragraph_margin": "段落内间距",
-        "title_margin": "标题间距"
-    }},
-    "image_design": {{
-        "max_width": "图片最大宽度",
-        "border_radius": "圆角大小",
-        "shadow": "阴影效果",
-        "border": "边框样式"
-    }}
-}}
-
-请返回JSON格式的完整设计方案。
-"""
+        design_prompt = _DESIGN_LAYOUT_PROMPT.format(
+            style=requirements.get('style', '现代简约'),
+            output_format=requirements.get('format', 'HTML'),
+            special_requirements=requirements.get('special_requirements', '无'),
+            title_count=len(doc_structure.get('titles', [])),
+            image_count=len(doc_structure.get('images', [])),
+            paragraph_count=len(doc_structure.get('paragraphs', []))
+        )
         
         result = call_llm(design_prompt)
         
         try:
-            if "```json" in result:
-                json_str = result.split("```json")[1].split("```")[0].strip()
-            else:
-                json_str = result
-            
-            layout_design = json.loads(json_str)
-            return layout_design
-        except json.JSONDecodeError:
-            # 返回默认设计方案
+            layout_design = LAYOUT_DESIGN_DECODER.decode(result)
+        except fast_json.JSONDecodeError:
+            # 使用默认设计方案
             logger.warning("无法解析设计方案，使用默认设计")
-            return {
+            layout_design = {
                 "typography": {
                     "primary_font": "'Segoe UI', sans-serif",
                     "heading_sizes": {"h1": "2.5em", "h2": "2em", "h3": "1.5em"},
@@ -238,13 +378,14 @@ class DesignLayoutNode(Node):
                     "border": "none"
                 }
             }
+        
+        return LayoutDesign.from_dict(layout_design)
     
     def post(self, shared, prep_res, exec_res):
         """保存设计方案"""
         shared["layout_design"] = exec_res
         
-        primary_color = exec_res.get("colors", {}).get("primary", "Unknown")
-        logger.info(f"排版设计完成: 主色调 {primary_color}")
+        logger.info("排版设计完成: 主色调 %s", exec_res.colors.primary or "Unknown")
         
         return "default"
 
@@ -255,8 +396,9 @@ class ProcessTextNode(Node):
         """准备文档内容和设计方案"""
         return {
             "original_content": shared.get("original_document", ""),
-            "layout_design": shared.get("layout_design", {}),
-            "requirements": shared.get("requirements", {})
+            "layout_design": shared.get("layout_design") or LayoutDesign(),
+            "requirements": shared.get("requirements", {}),
+            "document_structure": shared.get("document_structure", {})
         }
     
     def exec(self, prep_res):
@@ -270,32 +412,22 @@ class ProcessTextNode(Node):
         # 应用基本样式
         styles = {
             "title_style": {
-                "color": layout_design.get("colors", {}).get("primary", "#2196F3"),
+                "color": layout_design.colors.primary or "#2196F3",
                 "prefix": "",
                 "suffix": ""
             },
-            "paragraph_style": layout_design.get("spacing", {})
+            "paragraph_style": layout_design.spacing.to_dict()
         }
         
         processed_content = apply_styles(content, styles)
         
-        # 使用LLM优化文本结构
-        optimization_prompt = f"""
-请优化以下文档的文本结构和格式：
-
-原始内容：
-{content}
-
-优化要求：
-1. 确保标题层次清晰
-2. 段落结构合理
-3. 添加必要的分隔和强调
-4. 保持原始内容的完整性
-
-请返回优化后的Markdown格式文档。
-"""
-        
-        optimized_content = call_llm(optimization_prompt)
+        if _is_well_structured(prep_res["document_structure"]):
+            logger.info("跳过LLM优化: 文档结构良好")
+            optimized_content = processed_content
+        else:
+            # 使用LLM优化文本结构
+            optimization_prompt = _OPTIMIZE_TEXT_PROMPT.format(content=content)
+            optimized_content = call_llm(optimization_prompt)
         
         return {
             "processed_content": processed_content,
@@ -316,7 +448,7 @@ class UnifyImagesNode(Node):
         """准备图片信息和设计方案"""
         return {
             "document_structure": shared.get("document_structure", {}),
-            "layout_design": shared.get("layout_design", {}),
+            "layout_design": shared.get("layout_design") or LayoutDesign(),
             "requirements": shared.get("requirements", {})
         }
     
@@ -331,7 +463,7 @@ class UnifyImagesNode(Node):
             return {"message": "没有发现图片，跳过图片处理"}
         
         # 构建图片处理效果配置
-        image_design = layout_design.get("image_design", {})
+        image_design = layout_design.image_design
         
         effects = {
             "resize": {
@@ -346,29 +478,32 @@ class UnifyImagesNode(Node):
         }
         
         # 添加边框和圆角
-        if image_design.get("border_radius"):
+        if image_design.border_radius:
             effects["rounded_corners"] = {
-                "radius": int(image_design["border_radius"].replace("px", ""))
+                "radius": int(image_design.border_radius.replace("px", ""))
             }
         
-        if image_design.get("shadow"):
+        if image_design.shadow:
             effects["shadow"] = {
                 "offset": (5, 5),
                 "blur_radius": 8,
                 "color": "#00000020"
             }
         
-        # 模拟图片处理（实际应用中需要真实的图片文件）
-        processed_images = []
-        for img in images:
-            processed_img = {
+        # 本地存在的图片一次性交给批量处理，其余（如远程URL）保留模拟的处理结果
+        local_paths = [img["url"] for img in images if os.path.isfile(img["url"])]
+        processed_paths = dict(zip(local_paths, batch_process_images(local_paths, effects))) if local_paths else {}
+        
+        processed_images = [
+            {
                 "original_url": img["url"],
                 "alt_text": img["alt_text"],
                 "effects_applied": effects,
-                "new_url": f"processed_{img['url']}",
+                "new_url": processed_paths.get(img["url"]) or f"processed_{img['url']}",
                 "section": img.get("section", "")
             }
-            processed_images.append(processed_img)
+            for img in images
+        ]
         
         return {
             "processed_images": processed_images,
@@ -380,8 +515,7 @@ class UnifyImagesNode(Node):
         """保存图片处理结果"""
         shared["processed_images"] = exec_res
         
-        count = exec_res.get("total_processed", 0)
-        logger.info(f"图片处理完成: {count}张图片已统一")
+        logger.info("图片处理完成: %s张图片已统一", exec_res.get("total_processed", 0))
         
         return "default"
 
@@ -393,7 +527,7 @@ class GenerateDocumentNode(Node):
         return {
             "processed_text": shared.get("processed_text", {}),
             "processed_images": shared.get("processed_images", {}),
-            "layout_design": shared.get("layout_design", {}),
+            "layout_design": shared.get("layout_design") or LayoutDesign(),
             "requirements": shared.get("requirements", {})
         }
     
@@ -415,8 +549,8 @@ class GenerateDocumentNode(Node):
         if output_format == "HTML":
             # 生成HTML文档
             styles = {
-                "title_style": layout_design.get("colors", {}),
-                "image_style": layout_design.get("image_design", {})
+                "title_style": layout_design.colors.to_dict(),
+                "image_style": layout_design.image_design.to_dict()
             }
             
             html_content = generate_html_from_markdown(content, styles)
@@ -432,7 +566,7 @@ class GenerateDocumentNode(Node):
             return {
                 "format": "MARKDOWN",
                 "content": content,
-                "styles_applied": layout_design
+                "styles_applied": layout_design.to_dict()
             }
         
         else:
@@ -447,10 +581,10 @@ class GenerateDocumentNode(Node):
         """保存最终文档"""
         shared["final_document"] = exec_res
         
-        doc_format = exec_res.get("format", "Unknown")
-        content_length = len(exec_res.get("content", ""))
-        
-        logger.info(f"文档生成完成: {doc_format}格式, {content_length}字符")
+        if logger.isEnabledFor(logging.INFO):
+            doc_format = exec_res.get("format", "Unknown")
+            content_length = len(exec_res.get("content", ""))
+            logger.info("文档生成完成: %s格式, %d字符", doc_format, content_length)
         
         # 保存到文件
         self._save_document(exec_res)
@@ -473,13 +607,14 @@ class GenerateDocumentNode(Node):
             else:
                 filename = f"output/formatted_document.{format_type.lower()}"
             
-            with open(filename, "w", encoding="utf-8") as f:
-                f.write(content)
+            # 分段编码写入，避免一次性生成与整个文档等长的编码副本
+            with open(filename, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+                f.writelines(_iter_chunks(content, WRITE_BUFFER_SIZE))
             
-            logger.info(f"文档已保存到: {filename}")
+            logger.info("文档已保存到: %s", filename)
         
         except Exception as e:
-            logger.error(f"保存文档失败: {e}")
+            logger.error("保存文档失败: %s", e)
 
 # 错误处理节点
 class ErrorHandlingNode(Node):
@@ -492,7 +627,7 @@ class ErrorHandlingNode(Node):
     def exec(self, prep_res):
         """处理错误"""
         if prep_res:
-            logger.error(f"处理过程中发生错误: {prep_res}")
+            logger.error("处理过程中发生错误: %s", prep_res)
             return {"handled": True, "error": prep_res}
         return {"handled": False}
     
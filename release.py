@@ -7,26 +7,48 @@
 """
 
 import os
+import re
 import sys
 import subprocess
-import json
 import argparse
+from dataclasses import dataclass, field
 from datetime import datetime
-from pathlib import Path
+from functools import lru_cache
+from utils.version_info import get_version_info, VERSION_FILE
+from utils import fast_json
 
-def get_current_version():
-    """获取当前版本号"""
-    version_file = Path("version.json")
-    if version_file.exists():
-        with open(version_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data.get('version', '1.0.0')
-    return '1.0.0'
+# 语义化版本号 主版本.次版本.修订号
+_SEMVER_RE = re.compile(r'^(\d+)\.(\d+)\.(\d+)$')
+
+# 非终端标准输入（CI管道）中预先给出的确认回答，首次询问时一次读入
+_piped_answers = None
+
+def ask_yes_no(prompt, assume_yes=False):
+    """询问 y/N 确认；标准输入不是终端时一次读入全部输入，按行依次作为各问题的回答，读完后默认为否"""
+    global _piped_answers
+    if assume_yes:
+        print(f"{prompt}y")
+        return True
+    if sys.stdin.isatty():
+        return input(prompt).strip().lower() == 'y'
+    if _piped_answers is None:
+        _piped_answers = sys.stdin.read().splitlines()
+    answer = _piped_answers.pop(0).strip() if _piped_answers else ''
+    print(f"{prompt}{answer}")
+    return answer.lower() == 'y'
+
+def get_current_version(version_info=None):
+    """获取当前版本号，version_info 为已加载的版本信息（省略时读取版本文件）"""
+    if version_info is None:
+        version_info = get_version_info()
+    return version_info.get('version', '1.0.0')
 
 def bump_version(current_version, bump_type='patch'):
     """版本号升级"""
-    parts = current_version.split('.')
-    major, minor, patch = int(parts[0]), int(parts[1]), int(parts[2])
+    match = _SEMVER_RE.match(current_version)
+    if not match:
+        raise ValueError(f"无效的版本号: {current_version}（应为 主版本.次版本.修订号）")
+    major, minor, patch = map(int, match.groups())
     
     if bump_type == 'major':
         major += 1
@@ -40,64 +62,147 @@ def bump_version(current_version, bump_type='patch'):
     
     return f"{major}.{minor}.{patch}"
 
-def update_version_file(version):
-    """更新版本文件"""
+def _atomic_write_bytes(path, data):
+    """先写入同目录的临时文件并落盘，再原子替换目标文件；写入中断时原文件保持完整"""
+    tmp_path = f"{path}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def update_version_file(version, build_time=None, version_info=None):
+    """
+    更新版本文件，发布日期和构建号取自同一时刻 build_time（默认当前时间）
+    在已加载的 version_info（省略时读取版本文件）基础上更新，保留描述、特性列表等其余字段
+    """
+    if build_time is None:
+        build_time = datetime.now()
+    if version_info is None:
+        version_info = get_version_info()
     version_data = {
+        **version_info,
         "version": version,
-        "release_date": datetime.now().isoformat(),
-        "build_number": int(datetime.now().timestamp())
+        "release_date": build_time.isoformat(),
+        "build_number": int(build_time.timestamp())
     }
     
-    with open("version.json", 'w', encoding='utf-8') as f:
-        json.dump(version_data, f, indent=2, ensure_ascii=False)
+    # 先在内存中完成编码，再一次性原子写入
+    _atomic_write_bytes(VERSION_FILE, fast_json.dumps_bytes(version_data, indent=True))
     
     print(f"📝 更新版本文件: {version}")
 
-def run_command(cmd, capture_output=False):
-    """运行命令"""
+def run_command(cmd, capture_output=False, quiet=False, input=None):
+    """
+    运行命令（cmd为参数列表，直接执行而不经过shell解析）
+    quiet=True 时丢弃标准输出，只通过管道收集标准错误，失败时打印出来
+    input 为写入命令标准输入的文本（提交/标签说明经 -F - 传入，不占用命令行长度）
+    """
     try:
+        if quiet:
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                    input=input, text=True)
+            if result.returncode != 0 and result.stderr:
+                print(result.stderr.rstrip())
+            return result.returncode == 0, "", result.stderr
+        result = subprocess.run(cmd, capture_output=capture_output, input=input, text=True)
         if capture_output:
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
             return result.returncode == 0, result.stdout, result.stderr
-        else:
-            result = subprocess.run(cmd, shell=True)
-            return result.returncode == 0, "", ""
+        return result.returncode == 0, "", ""
     except Exception as e:
         print(f"❌ 命令执行失败: {e}")
         return False, "", str(e)
 
-def check_git_status():
-    """检查Git状态"""
-    success, output, _ = run_command("git status --porcelain", capture_output=True)
+def _parse_porcelain_v2(output):
+    """解析 git status --porcelain=v2 --branch 的输出，返回 (分支信息字典, 变更列表)"""
+    branch = {}
+    changes = []
+    for line in output.splitlines():
+        if line.startswith('# '):
+            key, _, value = line[2:].partition(' ')
+            branch[key] = value
+        elif line.startswith('1 '):
+            fields = line.split(' ', 8)
+            changes.append(f"{fields[1]} {fields[8]}")
+        elif line.startswith('2 '):
+            fields = line.split(' ', 9)
+            path = fields[9].split('\t')[0]  # 重命名/复制记录为 "新路径\t原路径"
+            changes.append(f"{fields[1]} {path}")
+        elif line.startswith('u '):
+            fields = line.split(' ', 10)
+            changes.append(f"{fields[1]} {fields[10]}")
+        elif line.startswith('? '):
+            changes.append(f"?? {line[2:]}")
+    return branch, changes
+
+@dataclass
+class GitState:
+    """一次 git status 调用得到的仓库状态，发布流程各步骤共用"""
+    branch: str = 'main'
+    upstream: str = ''
+    ahead: int = 0
+    behind: int = 0
+    changes: list = field(default_factory=list)
+
+def read_git_state():
+    """读取Git状态（一次 git status 调用同时获取工作区变更和分支/上游信息），失败时返回None"""
+    success, output, _ = run_command(
+        ["git", "status", "--porcelain=v2", "--branch"], capture_output=True
+    )
     if not success:
-        print("❌ 无法检查Git状态")
-        return False
+        return None
     
-    if output.strip():
+    branch, changes = _parse_porcelain_v2(output)
+    state = GitState(upstream=branch.get('branch.upstream', ''), changes=changes)
+    head = branch.get('branch.head', '')
+    if head and head != '(detached)':
+        state.branch = head
+    ahead_behind = branch.get('branch.ab', '').split()
+    if len(ahead_behind) == 2:
+        state.ahead = int(ahead_behind[0])
+        state.behind = -int(ahead_behind[1])
+    return state
+
+def check_git_status(state, assume_yes=False):
+    """检查Git状态"""
+    # 落后于上游时原子推送必然被拒绝，提前提示
+    if state.behind:
+        print(f"⚠️  当前分支 {state.branch} 落后于 {state.upstream or '上游'} "
+              f"{state.behind} 个提交，推送可能失败")
+    
+    changes = state.changes
+    if changes:
         print("⚠️  工作目录有未提交的更改:")
-        print(output)
-        response = input("是否继续? (y/N): ")
-        return response.lower() == 'y'
+        print("\n".join(changes))
+        return ask_yes_no("是否继续? (y/N): ", assume_yes)
     
     return True
 
-def create_git_tag(version):
+def create_git_tag(version, assume_yes=False):
     """创建Git标签"""
     tag_name = f"v{version}"
     
     # 检查标签是否已存在
-    success, _, _ = run_command(f"git tag -l {tag_name}", capture_output=True)
-    if success:
+    success, output, _ = run_command(["git", "tag", "-l", tag_name], capture_output=True)
+    if success and output.strip():
         print(f"⚠️  标签 {tag_name} 已存在")
-        response = input("是否删除并重新创建? (y/N): ")
-        if response.lower() == 'y':
-            run_command(f"git tag -d {tag_name}")
-            run_command(f"git push origin --delete {tag_name}")
+        if ask_yes_no("是否删除并重新创建? (y/N): ", assume_yes):
+            run_command(["git", "tag", "-d", tag_name], quiet=True)
+            run_command(["git", "push", "origin", "--delete", tag_name], quiet=True)
         else:
             return False
     
     # 创建标签
-    success, _, _ = run_command(f"git tag -a {tag_name} -m 'Release {tag_name}'")
+    success, _, _ = run_command(["git", "tag", "-a", tag_name, "-F", "-"],
+                                 quiet=True, input=f"Release {tag_name}\n")
     if not success:
         print(f"❌ 创建标签失败: {tag_name}")
         return False
@@ -105,27 +210,31 @@ def create_git_tag(version):
     print(f"✅ 创建标签: {tag_name}")
     return True
 
-def push_to_github(version):
+def push_to_github(version, branch='main'):
     """推送到GitHub"""
     tag_name = f"v{version}"
     
-    # 推送代码
-    print("📤 推送代码到GitHub...")
-    success, _, _ = run_command("git push origin main")
-    if not success:
-        print("❌ 推送代码失败")
-        return False
-    
-    # 推送标签
-    print("📤 推送标签到GitHub...")
-    success, _, _ = run_command(f"git push origin {tag_name}")
+    # 代码和标签一次原子推送：共用一次连接，且不会出现只推送了其中之一的情况
+    print("📤 推送代码和标签到GitHub...")
+    success, _, _ = run_command(["git", "push", "--atomic", "origin", branch, tag_name], quiet=True)
     if not success:
-        print("❌ 推送标签失败")
+        print("❌ 推送代码和标签失败")
         return False
     
     print("✅ 推送完成")
     return True
 
+@lru_cache(maxsize=None)
+def get_remote_url():
+    """获取origin远程仓库的网页地址，失败时返回None"""
+    success, output, _ = run_command(["git", "remote", "get-url", "origin"], capture_output=True)
+    if not success:
+        return None
+    repo_url = output.strip()
+    if repo_url.endswith('.git'):
+        repo_url = repo_url[:-4]
+    return repo_url
+
 def main():
     parser = argparse.ArgumentParser(description='自动发布智能文档处理系统')
     parser.add_argument('--bump', choices=['major', 'minor', 'patch'], 
@@ -133,6 +242,7 @@ def main():
     parser.add_argument('--version', help='手动指定版本号')
     parser.add_argument('--build-only', action='store_true', help='仅构建，不发布')
     parser.add_argument('--skip-git-check', action='store_true', help='跳过Git状态检查')
+    parser.add_argument('--yes', '-y', action='store_true', help='所有确认均回答是（用于CI）')
     
     args = parser.parse_args()
     
@@ -140,26 +250,36 @@ def main():
     print("  智能文档处理系统 - 自动发布")
     print("🚀" + "=" * 50)
     
-    # 检查Git状态
-    if not args.skip_git_check and not check_git_status():
-        print("❌ Git状态检查失败")
-        sys.exit(1)
+    # 检查Git状态：仓库状态只读取一次，后续推送直接使用其中的分支信息
+    git_state = GitState()
+    if not args.skip_git_check:
+        git_state = read_git_state()
+        if git_state is None:
+            print("❌ 无法检查Git状态")
+            sys.exit(1)
+        if not check_git_status(git_state, args.yes):
+            print("❌ Git状态检查失败")
+            sys.exit(1)
+    
+    # 版本信息只读取一次，确定版本号和更新版本文件共用
+    version_info = get_version_info()
     
     # 确定版本号
     if args.version:
         new_version = args.version
     else:
-        current_version = get_current_version()
+        current_version = get_current_version(version_info)
         new_version = bump_version(current_version, args.bump)
     
     print(f"📋 发布版本: {new_version}")
     
     # 更新版本文件
-    update_version_file(new_version)
+    build_time = datetime.now()
+    update_version_file(new_version, build_time, version_info)
     
     # 本地构建
     print("🔨 开始本地构建...")
-    success, _, _ = run_command("python build.py")
+    success, _, _ = run_command([sys.executable, "build.py"])
     if not success:
         print("❌ 本地构建失败")
         sys.exit(1)
@@ -170,16 +290,16 @@ def main():
     
     # 提交版本更新
     print("📝 提交版本更新...")
-    run_command("git add version.json")
-    run_command(f"git commit -m 'Release v{new_version}'")
+    run_command(["git", "add", VERSION_FILE], quiet=True)
+    run_command(["git", "commit", "-F", "-"], quiet=True, input=f"Release v{new_version}\n")
     
     # 创建Git标签
-    if not create_git_tag(new_version):
+    if not create_git_tag(new_version, args.yes):
         print("❌ 创建Git标签失败")
         sys.exit(1)
     
     # 推送到GitHub
-    if not push_to_github(new_version):
+    if not push_to_github(new_version, git_state.branch):
         print("❌ 推送到GitHub失败")
         sys.exit(1)
     
@@ -190,11 +310,8 @@ def main():
     print("🔗 查看构建状态:")
     
     # 获取仓库信息
-    success, output, _ = run_command("git remote get-url origin", capture_output=True)
-    if success:
-        repo_url = output.strip()
-        if repo_url.endswith('.git'):
-            repo_url = repo_url[:-4]
+    repo_url = get_remote_url()
+    if repo_url:
         print(f"   {repo_url}/actions")
         print(f"\n🚀 Release页面:")
         print(f"   {repo_url}/releases")
@@ -8,8 +8,11 @@
 
 import asyncio
 import argparse
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 import sys
 from pathlib import Path
 from typing import Optional
@@ -21,15 +24,70 @@ sys.path.insert(0, str(project_root))
 # 设置环境变量
 os.environ.setdefault("PYTHONPATH", str(project_root))
 
+from utils.logging_utils import CachedTimeFormatter
+
+# 单个输入文档的大小上限，超出时直接拒绝
+MAX_DOC_BYTES = 20 * 1024 * 1024
+MARKDOWN_EXTENSIONS = frozenset({'.md', '.markdown'})
+
+def read_document(file_path: str) -> str:
+    """读取文档：先按文件大小校验上限，再一次性读取字节并解码"""
+    path = Path(file_path)
+    if path.stat().st_size > MAX_DOC_BYTES:
+        raise ValueError(f"文件超过大小上限 {MAX_DOC_BYTES // (1024 * 1024)}MB")
+    content = path.read_bytes().decode("utf-8")
+    if "\r" in content:
+        # 与文本模式读取保持一致，统一换行符
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+    return content
+
+class BufferedFileHandler(logging.FileHandler):
+    """带64KB写缓冲的文件日志处理器，每累计 flush_every 条记录（或出现错误级别记录）才刷新一次"""
+    
+    def __init__(self, filename: str, flush_every: int = 50):
+        self.flush_every = flush_every
+        self._pending = 0
+        super().__init__(filename)
+    
+    def _open(self):
+        return open(self.baseFilename, self.mode, encoding=self.encoding,
+                    errors=self.errors, buffering=64 * 1024)
+    
+    def emit(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            self._pending += 1
+            if self._pending >= self.flush_every or record.levelno >= logging.ERROR:
+                self.flush()
+                self._pending = 0
+        except Exception:
+            self.handleError(record)
+
 def setup_logging(level: str = "INFO"):
-    """设置日志配置"""
+    """设置日志配置：控制台同步输出，文件写入由后台线程批量完成"""
+    formatter = CachedTimeFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    
+    file_handler = BufferedFileHandler('document_processor.log')
+    file_handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    # 退出时先停止监听线程（处理完队列），随后 logging.shutdown 刷新文件缓冲
+    atexit.register(listener.stop)
+    
+    # 队列处理器只传递原始消息，由文件处理器统一格式化
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    
     logging.basicConfig(
         level=getattr(logging, level.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler('document_processor.log')
-        ]
+        handlers=[stream_handler, queue_handler]
     )
 
 def start_web_server(host: str = "0.0.0.0", port: int = 8000, reload: bool = False):
@@ -171,10 +229,10 @@ async def process_cli_batch(
     documents = []
     for file_path in files:
         try:
-            content = Path(file_path).read_text(encoding="utf-8")
+            content = read_document(file_path)
             documents.append({
                 "content": content,
-                "file_type": "markdown" if file_path.endswith(('.md', '.markdown')) else "text",
+                "file_type": "markdown" if Path(file_path).suffix.lower() in MARKDOWN_EXTENSIONS else "text",
                 "source_file": file_path
             })
         except Exception as e:
@@ -269,6 +327,11 @@ def show_system_info():
 
 def main():
     """主函数"""
+    # 仅查看系统信息时直接输出，无需构建 argparse 解析器
+    if sys.argv[1:] == ["--info"]:
+        show_system_info()
+        return
+    
     parser = argparse.ArgumentParser(
         description="智能文档自动排版系统 - 优化版",
         formatter_class=argparse.RawDescriptionHelpFormatter
@@ -308,13 +371,14 @@ def main():
     
     args = parser.parse_args()
     
-    # 设置日志
-    setup_logging(args.log_level)
-    
+    # 仅显示信息时无需初始化日志（避免创建日志文件）
     if args.info:
         show_system_info()
         return
     
+    # 设置日志
+    setup_logging(args.log_level)
+    
     if args.web:
         # 启动Web服务器
         start_web_server(args.host, args.port, args.reload)
@@ -328,7 +392,7 @@ def main():
         # 获取文档内容
         if args.file:
             try:
-                content = Path(args.file).read_text(encoding="utf-8")
+                content = read_document(args.file)
             except Exception as e:
                 print(f"❌ 读取文件失败: {e}")
                 return
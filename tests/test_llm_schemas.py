@@ -0,0 +1,40 @@
+import unittest
+import sys
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils import fast_json
+from utils import llm_schemas
+from utils.llm_schemas import REQUIREMENTS_SCHEMA, SchemaDecoder
+
+REPLY = '''好的，解析结果如下：
+```json
+{"style": "商务", "format": "HTML", "layout": "单栏", "extra": 1}
+```'''
+
+class TestSchemaDecoder(unittest.TestCase):
+    def _decoders(self):
+        yield "default", SchemaDecoder("Requirements", REQUIREMENTS_SCHEMA)
+        with mock.patch.object(llm_schemas, "MSGSPEC_AVAILABLE", False):
+            yield "fallback", SchemaDecoder("Requirements", REQUIREMENTS_SCHEMA)
+
+    def test_mistyped_field_is_dropped_and_rest_kept(self):
+        for name, decoder in self._decoders():
+            with self.subTest(backend=name):
+                self.assertEqual(decoder.decode(REPLY), {"style": "商务", "format": "HTML"})
+
+    def test_valid_reply_keeps_known_fields_only(self):
+        for name, decoder in self._decoders():
+            with self.subTest(backend=name):
+                result = decoder.decode('{"style": "学术", "layout": {"columns": 2}, "x": 0}')
+                self.assertEqual(result, {"style": "学术", "layout": {"columns": 2}})
+
+    def test_non_object_reply_raises(self):
+        for name, decoder in self._decoders():
+            with self.subTest(backend=name):
+                with self.assertRaises(fast_json.JSONDecodeError):
+                    decoder.decode("没有JSON")
+
+if __name__ == '__main__':
+    unittest.main()
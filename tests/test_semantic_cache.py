@@ -0,0 +1,98 @@
+import unittest
+import tempfile
+import sys
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils import fast_json
+from utils import semantic_cache
+from utils.semantic_cache import SemanticCache
+
+class FakeIndex:
+    def __init__(self, ntotal):
+        self.ntotal = ntotal
+
+class FakeFaiss:
+    def __init__(self, ntotal):
+        self.ntotal = ntotal
+
+    def read_index(self, path):
+        return FakeIndex(self.ntotal)
+
+def _entry(i):
+    return {"key": f"k{i}", "response": f"r{i}"}
+
+class TestSemanticCacheLoad(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.entries_path = self.dir / "cache.jsonl"
+        self.index_path = self.dir / "cache.index"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write_entries(self, entries, tail=""):
+        self.entries_path.write_text(
+            "".join(fast_json.dumps(e) + "\n" for e in entries) + tail, encoding="utf-8"
+        )
+
+    def _read_entries(self):
+        lines = self.entries_path.read_text(encoding="utf-8").splitlines()
+        return [fast_json.loads(line) for line in lines]
+
+    def _load(self):
+        return SemanticCache(index_path=self.index_path, entries_path=self.entries_path)
+
+    def test_torn_last_line_is_dropped_from_file(self):
+        self._write_entries([_entry(0), _entry(1)], tail='{"key": "k2", "resp')
+        with mock.patch.object(semantic_cache, "SEMANTIC_CACHE_AVAILABLE", False):
+            cache = self._load()
+            self.assertEqual(self._read_entries(), [_entry(0), _entry(1)])
+
+            # 后续追加的条目另起一行，重新加载后仍可解析
+            cache.add("new text", "new response")
+            reloaded = self._load()
+        self.assertEqual(len(reloaded._entries), 3)
+        self.assertEqual(reloaded._entries[2]["response"], "new response")
+
+    def test_entries_truncated_to_index_rows(self):
+        self._write_entries([_entry(i) for i in range(3)])
+        self.index_path.write_bytes(b"")
+        with mock.patch.object(semantic_cache, "SEMANTIC_CACHE_AVAILABLE", True), \
+             mock.patch.object(semantic_cache, "faiss", FakeFaiss(2), create=True):
+            cache = self._load()
+        self.assertEqual(cache._entries, [_entry(0), _entry(1)])
+        self.assertEqual(self._read_entries(), [_entry(0), _entry(1)])
+
+    def test_entries_discarded_when_index_has_more_rows(self):
+        self._write_entries([_entry(0)])
+        self.index_path.write_bytes(b"")
+        with mock.patch.object(semantic_cache, "SEMANTIC_CACHE_AVAILABLE", True), \
+             mock.patch.object(semantic_cache, "faiss", FakeFaiss(5), create=True):
+            cache = self._load()
+        self.assertEqual(cache._entries, [])
+        self.assertEqual(self._read_entries(), [])
+
+    def test_expired_entries_miss_and_can_be_replaced(self):
+        with mock.patch.object(semantic_cache, "SEMANTIC_CACHE_AVAILABLE", False):
+            cache = self._load()
+            cache.add("some text", "old response")
+            self.assertEqual(cache.lookup("some  text"), "old response")
+
+            with mock.patch.object(semantic_cache.time, "time",
+                                   return_value=semantic_cache.time.time() + semantic_cache.CACHE_TTL + 1):
+                self.assertIsNone(cache.lookup("some text"))
+                cache.add("some text", "new response")
+                self.assertEqual(cache.lookup("some text"), "new response")
+
+    def test_consistent_file_is_not_rewritten(self):
+        self._write_entries([_entry(0)])
+        mtime = self.entries_path.stat().st_mtime_ns
+        with mock.patch.object(semantic_cache, "SEMANTIC_CACHE_AVAILABLE", False):
+            self._load()
+        self.assertEqual(self.entries_path.stat().st_mtime_ns, mtime)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -66,6 +66,7 @@ class AsyncLLMPool:
         # 连接池
         self.connector = None
         self.session = None
+        self.openai_client = None
         
         # 统计信息
         self.stats = LLMStats()
@@ -93,6 +94,9 @@ class AsyncLLMPool:
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """异步上下文管理器出口"""
+        if self.openai_client:
+            await self.openai_client.close()
+            self.openai_client = None
         if self.session:
             await self.session.close()
         if self.connector:
@@ -253,7 +257,10 @@ class AsyncLLMPool:
         if not api_key:
             raise ValueError("未设置 OPENAI_API_KEY 环境变量")
         
-        client = AsyncOpenAI(api_key=api_key)
+        # 池内复用同一个客户端，保持连接热身，避免每次请求重新握手
+        if self.openai_client is None:
+            self.openai_client = AsyncOpenAI(api_key=api_key)
+        client = self.openai_client
         
         # 构建消息
         messages = [{"role": "user", "content": prompt}]
@@ -1,12 +1,95 @@
 import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from functools import wraps, lru_cache
+from pathlib import Path
 from openai import OpenAI
 
+# 提示词版本：修改任何提示词模板后递增，使旧的缓存结果自动失效
+PROMPT_VERSION = "v1"
+
+# LLM结果磁盘缓存默认关闭（call_llm 使用 temperature=0.7，缓存会固定住本应变化的输出）；
+# 设置 POCKETFLOW_LLM_CACHE=1 开启，POCKETFLOW_LLM_CACHE_PATH 指定数据库位置
+LLM_CACHE_PATH = Path(os.getenv("POCKETFLOW_LLM_CACHE_PATH") or Path.home() / ".pocketflow" / "cache.db")
+
+def llm_cache_enabled() -> bool:
+    """是否启用LLM结果磁盘缓存（每次调用时读取环境变量）"""
+    return os.getenv("POCKETFLOW_LLM_CACHE", "").lower() in ("1", "true", "yes", "on")
+
+_cache_lock = threading.Lock()
+_cache_conn = None
+
+def _get_cache_conn():
+    """延迟打开缓存数据库，调用方需持有 _cache_lock"""
+    global _cache_conn
+    if _cache_conn is None:
+        LLM_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _cache_conn = sqlite3.connect(str(LLM_CACHE_PATH), check_same_thread=False)
+        _cache_conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache "
+            "(hash TEXT PRIMARY KEY, response TEXT, expires_at INTEGER)"
+        )
+    return _cache_conn
+
+def llm_cache(ttl=7 * 86400):
+    """
+    LLM调用结果的磁盘缓存装饰器，按 SHA-256(PROMPT_VERSION|model|max_tokens|prompt) 索引；
+    未启用缓存时直接调用原函数，不会创建数据库文件
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(prompt, model="gpt-4o", max_tokens=3000):
+            if not llm_cache_enabled():
+                return func(prompt, model, max_tokens)
+            key = hashlib.sha256(
+                f"{PROMPT_VERSION}|{model}|{max_tokens}|{prompt}".encode("utf-8")
+            ).hexdigest()
+            try:
+                with _cache_lock:
+                    row = _get_cache_conn().execute(
+                        "SELECT response FROM llm_cache WHERE hash = ? AND expires_at > ?",
+                        (key, int(time.time()))
+                    ).fetchone()
+                if row is not None:
+                    return row[0]
+            except sqlite3.Error as e:
+                print(f"读取LLM缓存失败: {e}")
+            
+            response = func(prompt, model, max_tokens)
+            # 调用失败时返回的错误文本不写入缓存
+            if response is None or response.startswith("错误: "):
+                return response
+            try:
+                with _cache_lock:
+                    conn = _get_cache_conn()
+                    conn.execute(
+                        "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?)",
+                        (key, response, int(time.time()) + ttl)
+                    )
+                    conn.commit()
+            except sqlite3.Error as e:
+                print(f"写入LLM缓存失败: {e}")
+            return response
+        return wrapper
+    return decorator
+
+@lru_cache(maxsize=1)
+def _get_client():
+    """
+    进程内共享的OpenAI客户端：复用其连接池，后续调用不再重复TCP/TLS握手
+    """
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+@llm_cache(ttl=7 * 86400)
 def call_llm(prompt, model="gpt-4o", max_tokens=3000):
     """
     基础LLM调用函数
     """
     try:
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = _get_client()
         response = client.chat.completions.create(
             model=model,
             messages=[{"role": "user", "content": prompt}],
@@ -18,11 +101,37 @@ def call_llm(prompt, model="gpt-4o", max_tokens=3000):
         print(f"LLM调用失败: {e}")
         return f"错误: 无法处理请求 - {str(e)}"
 
-def analyze_with_llm(content, task, model="gpt-4o"):
+def call_llm_stream(prompt, model="gpt-4o", max_tokens=3000):
     """
-    专门用于分析任务的LLM调用
+    流式LLM调用函数，逐块产出模型输出的文本
     """
-    prompt = f"""
+    try:
+        client = _get_client()
+        stream = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=0.7,
+            stream=True
+        )
+    except Exception as e:
+        print(f"LLM调用失败: {e}")
+        return
+    try:
+        for chunk in stream:
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+    finally:
+        # 调用方提前停止消费时关闭连接，避免继续生成（和计费）多余的token
+        stream.close()
+
+def build_analysis_prompt(content, task):
+    """
+    构建分析任务的提示词
+    """
+    return f"""
 作为一个专业的文档分析师，请帮我完成以下任务：
 
 ### 任务描述
@@ -36,7 +145,46 @@ def analyze_with_llm(content, task, model="gpt-4o"):
 - 使用JSON格式返回结果
 - 确保分析准确和实用
 """
-    return call_llm(prompt, model)
+
+def analyze_with_llm(content, task, model="gpt-4o"):
+    """
+    专门用于分析任务的LLM调用
+    """
+    return call_llm(build_analysis_prompt(content, task), model)
+
+def call_llm_batch(prompts, model="gpt-4o", max_tokens=3000):
+    """
+    批量LLM调用：把多个互不依赖的提示词合并为一次请求，按[index]拆分结果
+
+    返回与prompts等长的列表；某项缺失或整体解析失败时该项为None，由调用方回退
+    """
+    parts = ["Batch of tasks:"]
+    for index, prompt in enumerate(prompts, 1):
+        parts.append(f"[{index}] {prompt.strip()}")
+    parts.append('Respond with JSON array [{"index":1,"result":...},...]，'
+                 'result为对应任务要求的完整结果')
+    response = call_llm("\n".join(parts), model, max_tokens * len(prompts))
+
+    results = [None] * len(prompts)
+    start, end = response.find("["), response.rfind("]")
+    if start == -1 or end <= start:
+        return results
+    try:
+        items = json.loads(response[start:end + 1])
+    except json.JSONDecodeError:
+        return results
+    if not isinstance(items, list):
+        return results
+
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        index = item.get("index")
+        if isinstance(index, int) and 1 <= index <= len(prompts):
+            result = item.get("result")
+            # 各节点按单次调用的方式解析结果，因此统一还原为字符串
+            results[index - 1] = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+    return results
 
 def generate_with_llm(instruction, context="", model="gpt-4o"):
     """
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+控制台输入工具
+供 main.py 与 interactive_ui.py 的交互模式共用，不依赖任何重量级模块
+"""
+
+import re
+import sys
+
+# 旧输入方式的结束标记：单独一行的 END（不区分大小写）
+_END_LINE_RE = re.compile(r'^[ \t]*END[ \t]*$', re.MULTILINE | re.IGNORECASE)
+
+def read_pasted_content(prompt: str) -> str:
+    """
+    读取用户粘贴的多行文档内容，直到EOF（Ctrl-D，Windows下为Ctrl-Z后回车）
+    兼容 'END' 结束行：只保留第一个 END 行之前的内容
+    """
+    print(prompt)
+    content = sys.stdin.read()
+    match = _END_LINE_RE.search(content)
+    if match:
+        content = content[:match.start()].rstrip('\n')
+    return content
@@ -10,6 +10,7 @@ import re
 import json
 from typing import Dict, List, Any, Tuple
 from utils.call_llm import call_llm, analyze_with_llm
+from utils import fast_json
 from collections import Counter
 import math
 
@@ -231,8 +232,7 @@ class ContentAnalyzer:
         try:
             response = call_llm(prompt)
             if "```json" in response:
-                json_str = response.split("```json")[1].split("```")[0].strip()
-                suggestions = json.loads(json_str)
+                suggestions = fast_json.extract_json(response)
                 return suggestions
         except Exception as e:
             print(f"获取AI建议失败: {e}")
@@ -361,8 +361,7 @@ class SmartContentEnhancer:
         try:
             response = call_llm(prompt)
             if "```json" in response:
-                json_str = response.split("```json")[1].split("```")[0].strip()
-                return json.loads(json_str)
+                return fast_json.extract_json(response)
         except:
             pass
         
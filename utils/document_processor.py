@@ -2,7 +2,7 @@ import re
 import json
 import base64
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator
 import markdown
 from PIL import Image
 import io
@@ -147,17 +147,8 @@ def apply_styles(content: str, styles: Dict[str, Any]) -> str:
     
     return styled_content
 
-def generate_html_from_markdown(content: str, styles: Dict[str, Any] = None) -> str:
-    """
-    将Markdown转换为HTML，并应用样式
-    """
-    # 转换为HTML
-    html = markdown.markdown(content, extensions=['extra', 'codehilite'])
-    
-    # 添加CSS样式
-    if styles:
-        css = generate_css_from_styles(styles)
-        html = f"""
+# HTML页面外壳：静态部分在模块加载时构建一次，生成时只填入CSS并与正文按片段输出
+_HTML_HEAD_TEMPLATE = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -167,12 +158,34 @@ def generate_html_from_markdown(content: str, styles: Dict[str, Any] = None) ->
     </style>
 </head>
 <body>
-    {html}
+    """
+
+_HTML_FOOT = """
 </body>
 </html>
 """
+
+def stream_html_from_markdown(content: str, styles: Dict[str, Any] = None) -> Iterator[str]:
+    """
+    将Markdown转换为HTML并按片段（头部、正文、尾部）逐段产出，便于直接写入文件
+    """
+    # 转换为HTML
+    html = markdown.markdown(content, extensions=['extra', 'codehilite'])
+    
+    if not styles:
+        yield html
+        return
     
-    return html
+    # 添加CSS样式
+    yield _HTML_HEAD_TEMPLATE.format(css=generate_css_from_styles(styles))
+    yield html
+    yield _HTML_FOOT
+
+def generate_html_from_markdown(content: str, styles: Dict[str, Any] = None) -> str:
+    """
+    将Markdown转换为HTML，并应用样式
+    """
+    return "".join(stream_html_from_markdown(content, styles))
 
 def generate_css_from_styles(styles: Dict[str, Any]) -> str:
     """
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+JSON 编解码
+安装了 orjson 时使用 orjson（C实现，解析和序列化都明显快于标准库），否则回退到标准库 json
+"""
+
+import re
+import json
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# LLM回复中的 ```json ... ``` 或 ``` ... ``` 代码块
+_JSON_FENCE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.S)
+
+# orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，调用方统一捕获该异常即可
+JSONDecodeError = json.JSONDecodeError
+
+def loads(data):
+    """解析 JSON，data 可以是 str 或 UTF-8 编码的 bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps_bytes(obj, indent: bool = False) -> bytes:
+    """序列化为 UTF-8 编码的 JSON bytes，写文件时直接使用，orjson 下省去解码再编码"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+def dumps(obj, indent: bool = False) -> str:
+    """序列化为 JSON 字符串（保留非ASCII字符，indent 为 True 时使用2空格缩进）"""
+    if ORJSON_AVAILABLE:
+        return dumps_bytes(obj, indent).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
+
+def extract_json_payload(text: str) -> str:
+    """从LLM回复中取出JSON文本：优先取第一个代码块的内容，没有代码块时返回整段文本"""
+    match = _JSON_FENCE.search(text)
+    return match.group(1) if match else text
+
+def extract_json(text: str):
+    """从LLM回复中提取并解析JSON"""
+    return loads(extract_json_payload(text))
@@ -10,9 +10,11 @@ import os
 import json
 import base64
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Optional
 import re
 from datetime import datetime
+from functools import lru_cache
 
 try:
     import markdown
@@ -38,6 +40,43 @@ try:
 except ImportError:
     PPTX_AVAILABLE = False
 
+# 各格式的描述和可用性只取决于导入时的依赖检测结果，模块加载时构造一次
+_FORMATS_INFO = MappingProxyType({
+    "HTML": {
+        "name": "HTML网页",
+        "description": "适合在线查看和分享",
+        "available": True,
+        "extensions": [".html", ".htm"]
+    },
+    "MARKDOWN": {
+        "name": "Markdown文档",
+        "description": "轻量级标记语言，便于编辑",
+        "available": True,
+        "extensions": [".md", ".markdown"]
+    },
+    "PDF": {
+        "name": "PDF文档",
+        "description": "适合打印和正式分发",
+        "available": WEASYPRINT_AVAILABLE,
+        "extensions": [".pdf"],
+        "requirements": "pip install weasyprint" if not WEASYPRINT_AVAILABLE else None
+    },
+    "DOCX": {
+        "name": "Word文档",
+        "description": "Microsoft Word格式，便于编辑",
+        "available": DOCX_AVAILABLE,
+        "extensions": [".docx"],
+        "requirements": "pip install python-docx" if not DOCX_AVAILABLE else None
+    },
+    "PPTX": {
+        "name": "PowerPoint演示文稿",
+        "description": "演示文稿格式，适合展示",
+        "available": PPTX_AVAILABLE,
+        "extensions": [".pptx"],
+        "requirements": "pip install python-pptx" if not PPTX_AVAILABLE else None
+    }
+})
+
 class FormatConverter:
     """多格式转换器"""
     
@@ -71,21 +110,13 @@ class FormatConverter:
             }
         
         try:
-            if target_format == "HTML":
-                return self._convert_to_html(content, styles, metadata)
-            elif target_format == "PDF":
-                return self._convert_to_pdf(content, styles, metadata)
-            elif target_format == "DOCX":
-                return self._convert_to_docx(content, styles, metadata)
-            elif target_format == "PPTX":
-                return self._convert_to_pptx(content, styles, metadata)
-            elif target_format == "MARKDOWN":
-                return self._convert_to_markdown(content, styles, metadata)
-            else:
+            converter = self._CONVERTERS.get(target_format)
+            if converter is None:
                 return {
                     "success": False,
                     "error": f"格式 {target_format} 的转换器尚未实现"
                 }
+            return converter(self, content, styles, metadata)
         except Exception as e:
             return {
                 "success": False,
@@ -95,14 +126,27 @@ class FormatConverter:
     def _convert_to_html(self, content: str, styles: Dict[str, Any] = None, 
                         metadata: Dict[str, str] = None) -> Dict[str, Any]:
         """转换为HTML格式"""
+        full_html = self._build_html_document(content, self._generate_css(styles or {}), metadata)
+        
+        # 保存文件
+        output_path = self._save_file(full_html, "html")
+        
+        return {
+            "success": True,
+            "format": "HTML",
+            "file_path": output_path,
+            "content": full_html,
+            "size": len(full_html)
+        }
+    
+    def _build_html_document(self, content: str, css_styles: str,
+                             metadata: Dict[str, str] = None) -> str:
+        """将Markdown渲染为带样式的完整HTML文档（HTML和PDF转换共用）"""
         # 将Markdown转换为HTML
         html_content = markdown.markdown(content, extensions=['extra', 'codehilite', 'toc'])
         
-        # 生成CSS样式
-        css_styles = self._generate_css(styles or {})
-        
         # 构建完整的HTML文档
-        full_html = f"""
+        return f"""
 <!DOCTYPE html>
 <html lang="zh-CN">
 <head>
@@ -125,17 +169,6 @@ class FormatConverter:
 </body>
 </html>
 """
-        
-        # 保存文件
-        output_path = self._save_file(full_html, "html")
-        
-        return {
-            "success": True,
-            "format": "HTML",
-            "file_path": output_path,
-            "content": full_html,
-            "size": len(full_html)
-        }
     
     def _convert_to_pdf(self, content: str, styles: Dict[str, Any] = None, 
                        metadata: Dict[str, str] = None) -> Dict[str, Any]:
@@ -146,15 +179,12 @@ class FormatConverter:
                 "error": "PDF转换需要安装weasyprint库: pip install weasyprint"
             }
         
-        # 先转换为HTML
-        html_result = self._convert_to_html(content, styles, metadata)
-        if not html_result["success"]:
-            return html_result
-        
-        html_content = html_result["content"]
+        # 基础CSS只生成一次，HTML内嵌样式和PDF样式表共用；中间HTML只在内存中使用，不再额外保存文件
+        base_css = self._generate_css(styles or {})
+        html_content = self._build_html_document(content, base_css, metadata)
         
         # 创建PDF特定的CSS
-        pdf_css = self._generate_pdf_css(styles or {})
+        pdf_css = self._generate_pdf_css(styles or {}, base_css)
         
         try:
             # 使用WeasyPrint转换为PDF
@@ -323,19 +353,20 @@ class FormatConverter:
     def _convert_to_markdown(self, content: str, styles: Dict[str, Any] = None, 
                            metadata: Dict[str, str] = None) -> Dict[str, Any]:
         """转换为优化的Markdown格式"""
-        # 添加元数据
-        enhanced_content = ""
+        # 各部分先收集到列表中，最后一次拼接，避免每次 += 都复制整个文档
+        parts = []
         
+        # 添加元数据
         if metadata:
-            enhanced_content += "---\n"
-            for key, value in metadata.items():
-                enhanced_content += f"{key}: {value}\n"
-            enhanced_content += "---\n\n"
+            parts.append("---\n")
+            parts.extend(f"{key}: {value}\n" for key, value in metadata.items())
+            parts.append("---\n\n")
         
-        enhanced_content += content
+        parts.append(content)
         
         # 添加生成信息
-        enhanced_content += f"\n\n---\n*文档生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n"
+        parts.append(f"\n\n---\n*文档生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n")
+        enhanced_content = "".join(parts)
         
         # 保存文件
         output_path = self._save_file(enhanced_content, "md")
@@ -498,9 +529,10 @@ class FormatConverter:
         
         return css
     
-    def _generate_pdf_css(self, styles: Dict[str, Any]) -> str:
-        """生成PDF专用CSS"""
-        base_css = self._generate_css(styles)
+    def _generate_pdf_css(self, styles: Dict[str, Any], base_css: str = None) -> str:
+        """生成PDF专用CSS，base_css 为已生成的基础CSS（省略时按 styles 生成）"""
+        if base_css is None:
+            base_css = self._generate_css(styles)
         
         pdf_specific = """
         @page {
@@ -561,7 +593,8 @@ class FormatConverter:
         output_dir = Path("output")
         output_dir.mkdir(exist_ok=True)
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # 精确到微秒，同一秒内的并发导出不会写到同一个文件
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         filename = f"formatted_document_{timestamp}.{extension}"
         
         return str(output_dir / filename)
@@ -570,62 +603,37 @@ class FormatConverter:
         """保存文件"""
         output_path = self._get_output_path(extension)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        Path(output_path).write_text(content, encoding='utf-8')
         
         return output_path
     
-    def get_available_formats(self) -> Dict[str, Dict[str, Any]]:
-        """获取可用格式及其描述"""
-        formats_info = {
-            "HTML": {
-                "name": "HTML网页",
-                "description": "适合在线查看和分享",
-                "available": True,
-                "extensions": [".html", ".htm"]
-            },
-            "MARKDOWN": {
-                "name": "Markdown文档",
-                "description": "轻量级标记语言，便于编辑",
-                "available": True,
-                "extensions": [".md", ".markdown"]
-            },
-            "PDF": {
-                "name": "PDF文档",
-                "description": "适合打印和正式分发",
-                "available": WEASYPRINT_AVAILABLE,
-                "extensions": [".pdf"],
-                "requirements": "pip install weasyprint" if not WEASYPRINT_AVAILABLE else None
-            },
-            "DOCX": {
-                "name": "Word文档",
-                "description": "Microsoft Word格式，便于编辑",
-                "available": DOCX_AVAILABLE,
-                "extensions": [".docx"],
-                "requirements": "pip install python-docx" if not DOCX_AVAILABLE else None
-            },
-            "PPTX": {
-                "name": "PowerPoint演示文稿",
-                "description": "演示文稿格式，适合展示",
-                "available": PPTX_AVAILABLE,
-                "extensions": [".pptx"],
-                "requirements": "pip install python-pptx" if not PPTX_AVAILABLE else None
-            }
-        }
-        
-        return formats_info
+    def get_available_formats(self) -> Mapping[str, Dict[str, Any]]:
+        """获取可用格式及其描述（只读的模块级常量）"""
+        return _FORMATS_INFO
+    
+    # 目标格式 -> 转换方法（类体末尾所有方法都已定义）
+    _CONVERTERS = {
+        "HTML": _convert_to_html,
+        "PDF": _convert_to_pdf,
+        "DOCX": _convert_to_docx,
+        "PPTX": _convert_to_pptx,
+        "MARKDOWN": _convert_to_markdown
+    }
 
 # 便捷函数
+@lru_cache(maxsize=1)
+def _get_default_converter() -> FormatConverter:
+    """便捷函数共用的转换器（无请求级状态，首次使用时创建）"""
+    return FormatConverter()
+
 def convert_document(content: str, target_format: str, styles: Dict[str, Any] = None, 
                     metadata: Dict[str, str] = None) -> Dict[str, Any]:
     """转换文档的便捷函数"""
-    converter = FormatConverter()
-    return converter.convert_to_format(content, target_format, styles, metadata)
+    return _get_default_converter().convert_to_format(content, target_format, styles, metadata)
 
 def get_supported_formats() -> List[str]:
     """获取支持的格式列表"""
-    converter = FormatConverter()
-    return converter.supported_formats
+    return list(_get_default_converter().supported_formats)
 
 if __name__ == "__main__":
     # 测试格式转换功能
@@ -1,8 +1,15 @@
 import os
 from PIL import Image, ImageFilter, ImageDraw, ImageEnhance
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Optional
 import io
 import base64
+import atexit
+import multiprocessing
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 
 def resize_image(image_path: str, target_size: Tuple[int, int], maintain_aspect: bool = True) -> Image.Image:
     """
@@ -232,33 +239,111 @@ def image_to_base64(image: Image.Image, format: str = "PNG") -> str:
         print(f"图片转base64失败: {e}")
         return ""
 
-def batch_process_images(image_paths: List[str], effects: Dict[str, Any], output_dir: str = "processed") -> List[str]:
+def _process_and_save(image_path: str, output_path: str, effects: Dict[str, Any]) -> Optional[str]:
     """
-    批量处理图片
+    处理并保存单张图片（在子进程中执行，需保持为模块级函数以便pickle）
     """
-    processed_paths = []
+    try:
+        processed_img = process_image_with_effects(image_path, effects)
+        if processed_img:
+            if save_image(processed_img, output_path):
+                print(f"已处理: {image_path} -> {output_path}")
+                return output_path
+            print(f"保存失败: {image_path}")
+        else:
+            print(f"处理失败: {image_path}")
+    except Exception as e:
+        print(f"批量处理失败 {image_path}: {e}")
+    return None
+
+# 共享的图片处理进程池：首次使用时创建，进程退出时关闭
+IMAGE_POOL_WORKERS = os.cpu_count() or 1
+_image_pool = None
+_image_pool_lock = threading.Lock()
+
+def _preload_pillow():
+    """
+    工作进程初始化：子进程解析该函数时即导入本模块，Pillow及ImageFilter等随模块顶部的导入一并加载；
+    这里再注册全部图片格式插件，避免首个任务打开图片时才按需加载
+    """
+    Image.init()
+
+def _noop():
+    return None
+
+def _pool_context():
+    """
+    工作进程的启动方式：调用方进程中已有线程池、日志监听等线程，直接 fork 可能继承被持有的锁而死锁，
+    因此使用 forkserver（不支持的平台如 Windows 使用 spawn）
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+def get_image_pool() -> ProcessPoolExecutor:
+    """获取共享的图片处理进程池"""
+    global _image_pool
+    with _image_pool_lock:
+        if _image_pool is None:
+            _image_pool = ProcessPoolExecutor(
+                max_workers=IMAGE_POOL_WORKERS, mp_context=_pool_context(), initializer=_preload_pillow
+            )
+            atexit.register(_image_pool.shutdown)
+        return _image_pool
+
+def _reset_image_pool(broken: ProcessPoolExecutor):
+    """工作进程异常退出（如被OOM终止）后进程池不可再用：关闭它，下次使用时重新创建"""
+    global _image_pool
+    with _image_pool_lock:
+        if _image_pool is broken:
+            _image_pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+def prewarm_image_pool():
+    """
+    预热进程池：提交空任务促使工作进程提前启动并导入Pillow，不等待其完成。
+    在LLM调用之前调用，进程启动开销即可与网络等待重叠
+    """
+    pool = get_image_pool()
+    try:
+        for _ in range(IMAGE_POOL_WORKERS):
+            pool.submit(_noop)
+    except BrokenProcessPool:
+        _reset_image_pool(pool)
+
+def batch_process_images(image_paths: List[str], effects: Dict[str, Any], output_dir: str = "processed",
+                         max_workers: Optional[int] = None) -> List[Optional[str]]:
+    """
+    批量处理图片，返回与 image_paths 一一对应的输出路径列表（处理失败的项为 None）
     
+    图片效果是CPU密集型操作，多张图片时分发到共享进程池并行处理；指定 max_workers 时使用单独的进程池
+    """
     # 确保输出目录存在
     os.makedirs(output_dir, exist_ok=True)
     
-    for i, image_path in enumerate(image_paths):
-        try:
-            processed_img = process_image_with_effects(image_path, effects)
-            if processed_img:
-                output_filename = f"processed_{i+1}.png"
-                output_path = os.path.join(output_dir, output_filename)
-                
-                if save_image(processed_img, output_path):
-                    processed_paths.append(output_path)
-                    print(f"已处理: {image_path} -> {output_path}")
-                else:
-                    print(f"保存失败: {image_path}")
-            else:
-                print(f"处理失败: {image_path}")
-        except Exception as e:
-            print(f"批量处理失败 {image_path}: {e}")
+    # 输出文件名带本次调用的唯一标识，并发处理多个文档时不会互相覆盖
+    batch_id = uuid.uuid4().hex[:12]
+    output_paths = [
+        os.path.join(output_dir, f"{os.path.splitext(os.path.basename(path))[0]}_{batch_id}_{i+1}.png")
+        for i, path in enumerate(image_paths)
+    ]
+    
+    if len(image_paths) <= 1:
+        return [_process_and_save(path, out, effects) for path, out in zip(image_paths, output_paths)]
+    
+    worker = partial(_process_and_save, effects=effects)
+    if max_workers is None:
+        # 共享进程池已损坏时重建并重试一次
+        for attempt in range(2):
+            pool = get_image_pool()
+            try:
+                return list(pool.map(worker, image_paths, output_paths, chunksize=4))
+            except BrokenProcessPool:
+                _reset_image_pool(pool)
+                if attempt:
+                    raise
     
-    return processed_paths
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=_pool_context()) as executor:
+        return list(executor.map(worker, image_paths, output_paths, chunksize=4))
 
 if __name__ == "__main__":
     # 测试图片处理功能
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+LLM返回结果的结构化解析
+按节点已知的JSON结构解码：安装了 msgspec 时使用按结构预编译的解码器（单次扫描、跳过未知字段、同时校验类型），
+否则回退到 fast_json 解析后再按同一结构筛选和校验。类型不符的字段只丢弃该字段，其余字段照常保留（调用方按 .get 取默认值）；
+回复中没有可解析的JSON对象时抛出 fast_json.JSONDecodeError。
+"""
+
+from typing import Any, Dict, Union
+
+from utils import fast_json
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+# 字段名 -> 类型；Any 表示不限制类型。LLM未返回的字段不会出现在结果中，调用方仍按 .get(key, 默认值) 读取
+REQUIREMENTS_SCHEMA = {
+    "style": str,
+    "format": str,
+    "layout": dict,
+    "image_style": dict,
+    "special_requirements": Any,
+}
+
+LAYOUT_DESIGN_SCHEMA = {
+    "typography": dict,
+    "colors": dict,
+    "spacing": dict,
+    "image_design": dict,
+}
+
+class SchemaDecoder:
+    """按固定结构解码LLM回复中的JSON对象"""
+
+    def __init__(self, name: str, schema: Dict[str, Any]):
+        self.schema = schema
+        if MSGSPEC_AVAILABLE:
+            struct = msgspec.defstruct(
+                name,
+                [(field, Union[tp, msgspec.UnsetType], msgspec.UNSET) for field, tp in schema.items()]
+            )
+            self._decoder = msgspec.json.Decoder(struct)
+
+    def decode(self, text: str) -> Dict[str, Any]:
+        """解析LLM回复，返回只包含结构内字段的字典"""
+        payload = fast_json.extract_json_payload(text)
+        if MSGSPEC_AVAILABLE:
+            try:
+                # to_builtins 会省略值为 UNSET（即LLM未返回）的字段
+                return msgspec.to_builtins(self._decoder.decode(payload))
+            except msgspec.ValidationError:
+                # JSON本身有效但有字段类型不符：改为逐字段筛选，只丢弃类型不符的字段
+                pass
+            except msgspec.DecodeError as e:
+                raise fast_json.JSONDecodeError(str(e), payload, 0) from e
+
+        data = fast_json.loads(payload)
+        if not isinstance(data, dict):
+            raise fast_json.JSONDecodeError("期望JSON对象", payload, 0)
+        return {
+            field: data[field] for field, tp in self.schema.items()
+            if field in data and (tp is Any or isinstance(data[field], tp))
+        }
+
+REQUIREMENTS_DECODER = SchemaDecoder("Requirements", REQUIREMENTS_SCHEMA)
+LAYOUT_DESIGN_DECODER = SchemaDecoder("LayoutDesign", LAYOUT_DESIGN_SCHEMA)
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日志工具
+"""
+
+import logging
+import time
+
+class CachedTimeFormatter(logging.Formatter):
+    """
+    缓存时间戳文本的日志格式化器
+    同一秒内的日志记录复用已格式化的日期时间，只拼接毫秒部分，
+    高频输出日志时 strftime 每秒最多调用一次；输出格式与 logging.Formatter 相同
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cached = (None, "")
+    
+    def formatTime(self, record, datefmt=None):
+        if datefmt:
+            return super().formatTime(record, datefmt)
+        
+        sec = int(record.created)
+        cached_sec, stamp = self._cached
+        if cached_sec != sec:
+            stamp = time.strftime(self.default_time_format, self.converter(sec))
+            self._cached = (sec, stamp)
+        return self.default_msec_format % (stamp, record.msecs)
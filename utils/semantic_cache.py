@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+语义缓存
+按文档内容的语义相似度复用LLM结果：近似重复的文档（仅空白或少量措辞不同）也能命中缓存。
+安装了 faiss 和 sentence-transformers 时使用向量检索（余弦相似度），否则回退为按规范化文本精确匹配。
+与LLM结果缓存共用开关（POCKETFLOW_LLM_CACHE），条目超过 CACHE_TTL 后视为未命中。
+"""
+
+import os
+import re
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from utils import fast_json
+
+try:
+    import numpy as np
+    import faiss
+    from sentence_transformers import SentenceTransformer
+    SEMANTIC_CACHE_AVAILABLE = True
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SIMILARITY_THRESHOLD = 0.98
+CACHE_TTL = 7 * 86400  # 秒，与LLM结果缓存一致
+
+CACHE_DIR = Path.home() / ".pocketflow"
+INDEX_PATH = CACHE_DIR / "semantic_cache.index"
+# 条目按行追加（JSON Lines），每次写入只追加一行而不是重写整个文件
+ENTRIES_PATH = CACHE_DIR / "semantic_cache.jsonl"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def _normalized_key(text: str) -> str:
+    """合并空白后的文本摘要"""
+    return hashlib.sha256(_WHITESPACE_RE.sub(" ", text).strip().encode("utf-8")).hexdigest()
+
+class SemanticCache:
+    """语义缓存：向量索引的第i行对应 entries[i]"""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD,
+                 index_path: Path = INDEX_PATH, entries_path: Path = ENTRIES_PATH):
+        self.threshold = threshold
+        self.index_path = Path(index_path)
+        self.entries_path = Path(entries_path)
+        self._lock = threading.Lock()
+        self._model = None
+        self._index = None
+        self._entries = []
+        self._by_key = {}
+        self._load()
+
+    def _load(self):
+        """从磁盘加载缓存条目和向量索引"""
+        self._entries = []
+        # 文件内容与保留的条目不一致（不完整行、截断或丢弃）时需要重写
+        needs_rewrite = False
+        try:
+            with open(self.entries_path, "rb") as f:
+                for line in f:
+                    try:
+                        self._entries.append(fast_json.loads(line))
+                    except fast_json.JSONDecodeError:
+                        # 上次追加中断留下的不完整行
+                        needs_rewrite = True
+                        break
+        except OSError:
+            pass
+
+        if SEMANTIC_CACHE_AVAILABLE and self._entries:
+            index = faiss.read_index(str(self.index_path)) if self.index_path.exists() else None
+            if index is not None and index.ntotal <= len(self._entries):
+                # 条目先于索引写入，多出的条目说明索引写入中断，截断到索引行数即可重新对齐
+                self._index = index
+                if index.ntotal < len(self._entries):
+                    self._entries = self._entries[:index.ntotal]
+                    needs_rewrite = True
+            else:
+                # 索引缺失或多于条目时无法对齐，整体丢弃重新积累
+                self._entries = []
+                needs_rewrite = True
+
+        self._by_key = {entry["key"]: entry for entry in self._entries}
+
+        if needs_rewrite:
+            # 磁盘上的条目文件必须与索引逐行对应，否则后续追加的条目会错位
+            self._rewrite_entries()
+
+    def _rewrite_entries(self):
+        """将条目文件原子地重写为当前内存中的条目"""
+        try:
+            self.entries_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.entries_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry in self._entries:
+                    f.write(fast_json.dumps(entry) + "\n")
+            os.replace(tmp_path, self.entries_path)
+        except OSError as e:
+            print(f"重写语义缓存条目失败: {e}")
+
+    def _embed(self, text: str):
+        """计算L2归一化的句向量（内积即余弦相似度）"""
+        if self._model is None:
+            self._model = SentenceTransformer(EMBEDDING_MODEL)
+        vector = self._model.encode([text], normalize_embeddings=True)
+        return np.asarray(vector, dtype="float32")
+
+    def lookup(self, text: str) -> Optional[str]:
+        """查找相似文本的缓存结果，未命中返回None"""
+        with self._lock:
+            entry = self._by_key.get(_normalized_key(text))
+            if entry is not None and self._is_fresh(entry):
+                return entry["response"]
+            if not SEMANTIC_CACHE_AVAILABLE or self._index is None or self._index.ntotal == 0:
+                return None
+
+            scores, ids = self._index.search(self._embed(text), 1)
+            if scores[0, 0] > self.threshold:
+                entry = self._entries[ids[0, 0]]
+                if self._is_fresh(entry):
+                    return entry["response"]
+            return None
+
+    @staticmethod
+    def _is_fresh(entry) -> bool:
+        """条目是否未过期（没有写入时间的旧条目视为过期）"""
+        return time.time() - entry.get("time", 0) < CACHE_TTL
+
+    def add(self, text: str, response: str):
+        """写入缓存并持久化"""
+        key = _normalized_key(text)
+        with self._lock:
+            existing = self._by_key.get(key)
+            if existing is not None and self._is_fresh(existing):
+                return
+
+            if SEMANTIC_CACHE_AVAILABLE:
+                vector = self._embed(text)
+                if self._index is None:
+                    self._index = faiss.IndexFlatIP(vector.shape[1])
+                self._index.add(vector)
+
+            entry = {"key": key, "response": response, "time": time.time()}
+            self._entries.append(entry)
+            self._by_key[key] = entry
+
+            try:
+                self.entries_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.entries_path, "a", encoding="utf-8") as f:
+                    f.write(fast_json.dumps(self._entries[-1]) + "\n")
+                if self._index is not None:
+                    # 先写临时文件再原子替换，中断时不会留下损坏的索引
+                    tmp_path = self.index_path.with_suffix(".tmp")
+                    faiss.write_index(self._index, str(tmp_path))
+                    os.replace(tmp_path, self.index_path)
+            except OSError as e:
+                print(f"写入语义缓存失败: {e}")
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_semantic_cache() -> SemanticCache:
+    """获取全局语义缓存实例（首次使用时加载）"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = SemanticCache()
+        return _default_cache
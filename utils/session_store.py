@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+会话结果共享存储
+设置了环境变量 REDIS_URL 且安装了 redis 时，已结束会话的状态和结果写入 Redis（带过期时间），
+多进程/多副本部署时任一工作进程都能查询到其他进程处理完成的会话；未配置时不启用，会话只保存在本进程内存中。
+会话的处理事件按会话分频道发布，每个工作进程只订阅本进程持有WebSocket连接的会话频道。
+"""
+
+import os
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from utils import fast_json
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# 与进程内过期会话清理的时限一致
+SESSION_TTL = 3600
+_KEY_PREFIX = "pocketflow:session:"
+_CHANNEL_PREFIX = "pocketflow:session-events:"
+
+class RedisSessionStore:
+    """以 JSON 保存会话的 Redis 存储，键到期自动删除"""
+
+    def __init__(self, url: str, ttl: int = SESSION_TTL):
+        self._client = aioredis.from_url(url)
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self.ttl = ttl
+
+    async def save(self, session_id: str, session: Dict[str, Any]):
+        """写入会话并重置过期时间"""
+        await self._client.set(_KEY_PREFIX + session_id, fast_json.dumps_bytes(session), ex=self.ttl)
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """读取会话，不存在或已过期时返回None"""
+        data = await self._client.get(_KEY_PREFIX + session_id)
+        return fast_json.loads(data) if data is not None else None
+
+    async def publish(self, session_id: str, payload: bytes):
+        """向会话的事件频道发布一条已编码的消息"""
+        await self._client.publish(_CHANNEL_PREFIX + session_id, payload)
+
+    async def subscribe(self, session_id: str):
+        await self._pubsub.subscribe(_CHANNEL_PREFIX + session_id)
+
+    async def unsubscribe(self, session_id: str):
+        await self._pubsub.unsubscribe(_CHANNEL_PREFIX + session_id)
+
+    async def listen(self) -> AsyncIterator[Tuple[str, bytes]]:
+        """依次产出订阅频道收到的 (session_id, 消息)，当前没有任何订阅时结束"""
+        async for message in self._pubsub.listen():
+            yield message["channel"].decode()[len(_CHANNEL_PREFIX):], message["data"]
+
+    async def close(self):
+        await self._pubsub.aclose()
+        await self._client.aclose()
+
+@lru_cache(maxsize=1)
+def get_session_store() -> Optional[RedisSessionStore]:
+    """获取共享会话存储，未设置 REDIS_URL 或未安装 redis 时返回None"""
+    url = os.getenv("REDIS_URL")
+    if not url or not REDIS_AVAILABLE:
+        return None
+    return RedisSessionStore(url)
@@ -12,6 +12,7 @@ import yaml
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
 from utils.call_llm import call_llm
 
 class DocumentTemplate:
@@ -106,10 +107,9 @@ class TemplateManager:
         
         if self.templates_file.exists():
             try:
-                with open(self.templates_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    for name, template_data in data.items():
-                        templates[name] = DocumentTemplate(template_data)
+                data = json.loads(self.templates_file.read_text(encoding='utf-8'))
+                for name, template_data in data.items():
+                    templates[name] = DocumentTemplate(template_data)
             except Exception as e:
                 print(f"加载模板失败: {e}")
         
@@ -259,8 +259,9 @@ class TemplateManager:
             for name, template in self.templates.items():
                 templates_data[name] = template.to_dict()
             
-            with open(self.templates_file, 'w', encoding='utf-8') as f:
-                json.dump(templates_data, f, ensure_ascii=False, indent=2)
+            self.templates_file.write_text(
+                json.dumps(templates_data, ensure_ascii=False, indent=2), encoding='utf-8'
+            )
         except Exception as e:
             print(f"保存模板失败: {e}")
     
@@ -561,8 +562,9 @@ class SmartTemplateRecommender:
         return reasons
 
 # 便捷函数
+@lru_cache(maxsize=1)
 def get_template_manager() -> TemplateManager:
-    """获取模板管理器实例"""
+    """获取模板管理器实例（进程内共享，模板文件只在首次使用时加载）"""
     return TemplateManager()
 
 def recommend_templates_for_content(content: str, instruction: str = "") -> List[Dict[str, Any]]:
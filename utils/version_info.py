@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+版本信息读取
+供 main_minimal.py 和 release.py 共用；只依赖标准库（及可选的 orjson），保证 --version 等快速路径的导入开销最小
+"""
+
+import os
+from pathlib import Path
+from functools import lru_cache
+from utils.fast_json import loads as json_loads
+
+VERSION_FILE = 'version.json'
+
+DEFAULT_VERSION_INFO = {
+    "version": "1.0.0",
+    "description": "智能文档自动排版系统",
+    "release_date": "2024-12-28"
+}
+
+@lru_cache(maxsize=4)
+def _load_version_cached(path, mtime_ns):
+    """解析版本文件，按 (路径, 修改时间) 缓存，文件更新后自动失效"""
+    return json_loads(Path(path).read_bytes())
+
+def get_version_info(path: str = VERSION_FILE):
+    """获取版本信息，版本文件不存在时返回默认信息"""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return dict(DEFAULT_VERSION_INFO)
+    return _load_version_cached(path, mtime_ns)
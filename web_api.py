@@ -7,43 +7,61 @@ Web API服务 - FastAPI后端
 """
 
 import asyncio
-import json
+import codecs
+import functools
+import os
 import time
 import logging
 import uuid
+from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, UploadFile, File
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, UploadFile, File, Depends, Query
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, ORJSONResponse, Response
 from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
 
 # 导入处理模块
 from async_flow import (
     create_async_document_flow,
     create_batch_async_flow,
     auto_create_optimal_flow,
-    workflow_monitor,
-    adaptive_workflow
+    get_workflow_monitor
 )
 from utils.async_llm_pool import get_llm_stats, clear_llm_cache
+from utils import fast_json
+from utils.format_converter import convert_document
+from utils.session_store import get_session_store
 from intelligent_agent import IntelligentDocumentAgent
 
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 
+# 响应体达到该字节数时才进行gzip压缩
+GZIP_MINIMUM_SIZE = 1024
+
 # 创建FastAPI应用
 app = FastAPI(
     title="智能文档自动排版系统",
     description="基于AI的高性能文档处理平台",
     version="2.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    # 安装了 orjson 时响应体用 orjson 序列化
+    default_response_class=ORJSONResponse if fast_json.ORJSON_AVAILABLE else JSONResponse
 )
 
 # 配置CORS
@@ -55,12 +73,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 压缩较大的响应（处理结果、下载的文档等文本内容），小响应不值得压缩
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
+# 内存中最多保留的会话数（含处理结果），超出时淘汰最久未访问的已结束会话
+MAX_ACTIVE_SESSIONS = 200
+
 # 全局状态管理
 class AppState:
     def __init__(self):
-        self.active_sessions: Dict[str, Dict] = {}
+        # 按最近访问顺序排列：最久未访问的在最前
+        self.active_sessions: "OrderedDict[str, Dict]" = OrderedDict()
         self.processing_tasks: Dict[str, asyncio.Task] = {}
-        self.websocket_connections: Dict[str, WebSocket] = {}
+    
+    def add_session(self, session_id: str, session: Dict):
+        """登记新会话，超过上限时淘汰最久未访问的已结束会话"""
+        self.active_sessions[session_id] = session
+        excess = len(self.active_sessions) - MAX_ACTIVE_SESSIONS
+        if excess <= 0:
+            return
+        # 处理中的会话仍有任务在写入结果，不参与淘汰
+        evicted = [sid for sid, s in self.active_sessions.items()
+                   if s.get("status") != "processing"][:excess]
+        for sid in evicted:
+            del self.active_sessions[sid]
+            self.processing_tasks.pop(sid, None)
+    
+    def get_session(self, session_id: str) -> Optional[Dict]:
+        """获取会话并标记为最近访问，不存在时返回None"""
+        session = self.active_sessions.get(session_id)
+        if session is not None:
+            self.active_sessions.move_to_end(session_id)
+        return session
 
 app_state = AppState()
 
@@ -95,35 +139,214 @@ class SystemStatus(BaseModel):
     performance_metrics: Dict[str, Any]
 
 # WebSocket连接管理器
+# 上传文件的大小上限和分块读取大小
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# 客户端在握手时请求该子协议即改用 msgpack 二进制帧（需安装 msgpack），否则使用 JSON 文本帧
+MSGPACK_SUBPROTOCOL = "x-msgpack"
+
+# 广播时每批并发发送的连接数
+BROADCAST_BATCH_SIZE = 50
+
+# 单个进程同时保持的WebSocket连接上限，超出时以 1013 (Try Again Later) 关闭新连接
+MAX_WEBSOCKET_CONNECTIONS = 1000
+WS_CLOSE_TRY_AGAIN_LATER = 1013
+WS_CLOSE_INTERNAL_ERROR = 1011
+
+# 单条消息发送的超时（秒），超时的慢连接视为发送失败并断开，不会拖住其他连接
+WEBSOCKET_SEND_TIMEOUT = 1.0
+
+# 心跳回复内容固定，每种帧格式只在首次发送时编码一次
+_PONG_MESSAGE = {"type": "pong"}
+_PONG_PAYLOADS: Dict[bool, Any] = {}
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
-
-    async def connect(self, websocket: WebSocket, session_id: str):
-        await websocket.accept()
+        # 握手时协商了 msgpack 子协议的连接，消息以二进制帧收发
+        self.msgpack_connections: set = set()
+        # 转发共享存储频道事件的后台任务，没有订阅时自行结束，下次订阅时重新启动
+        self._event_listener: Optional[asyncio.Task] = None
+
+    async def connect(self, websocket: WebSocket, session_id: str) -> bool:
+        """接受连接并登记；连接数已达上限时关闭新连接并返回False（同一会话的重连不受限制）"""
+        if session_id not in self.active_connections and len(self.active_connections) >= MAX_WEBSOCKET_CONNECTIONS:
+            # 先接受握手再关闭，客户端才能收到关闭码并按退避策略重连
+            await websocket.accept()
+            await websocket.close(code=WS_CLOSE_TRY_AGAIN_LATER)
+            logger.warning(f"WebSocket连接数已达上限，拒绝连接: {session_id}")
+            return False
+
+        subprotocol = None
+        if MSGPACK_AVAILABLE and MSGPACK_SUBPROTOCOL in websocket.scope.get("subprotocols", []):
+            subprotocol = MSGPACK_SUBPROTOCOL
+            self.msgpack_connections.add(websocket)
+        await websocket.accept(subprotocol=subprotocol)
         self.active_connections[session_id] = websocket
         logger.info(f"WebSocket连接建立: {session_id}")
 
-    def disconnect(self, session_id: str):
-        if session_id in self.active_connections:
+        store = get_session_store()
+        if store is not None:
+            try:
+                await store.subscribe(session_id)
+                if self._event_listener is None or self._event_listener.done():
+                    self._event_listener = asyncio.create_task(self._forward_events(store))
+            except Exception as e:
+                logger.error(f"订阅会话事件失败 {session_id}: {e}")
+        return True
+
+    async def disconnect(self, session_id: str, websocket: Optional[WebSocket] = None):
+        """移除连接；指定 websocket 时只在它仍是该会话的当前连接时移除，不会误删重连后的新连接"""
+        current = self.active_connections.get(session_id)
+        if current is not None and (websocket is None or current is websocket):
             del self.active_connections[session_id]
+            self.msgpack_connections.discard(current)
+            store = get_session_store()
+            if store is not None:
+                try:
+                    await store.unsubscribe(session_id)
+                except Exception as e:
+                    logger.error(f"取消订阅会话事件失败 {session_id}: {e}")
+        if websocket is not None:
+            self.msgpack_connections.discard(websocket)
         logger.info(f"WebSocket连接断开: {session_id}")
 
-    async def send_message(self, session_id: str, message: dict):
-        if session_id in self.active_connections:
+    async def _drop(self, session_id: str, websocket: WebSocket):
+        """
+        发送失败或超时后丢弃连接：先以 1011 主动关闭，客户端收到关闭后按退避策略重连，
+        不会留下服务端已不再发送消息、客户端却仍在等待的半断开连接
+        """
+        try:
+            await asyncio.wait_for(websocket.close(code=WS_CLOSE_INTERNAL_ERROR), WEBSOCKET_SEND_TIMEOUT)
+        except Exception as e:
+            logger.debug(f"关闭WebSocket连接失败 {session_id}: {e}")
+        await self.disconnect(session_id, websocket)
+
+    async def receive_message(self, websocket: WebSocket) -> dict:
+        """按连接协商的格式接收并解析一条客户端消息"""
+        if websocket in self.msgpack_connections:
+            return msgpack.unpackb(await websocket.receive_bytes())
+        return fast_json.loads(await websocket.receive_text())
+
+    async def _send(self, websocket: WebSocket, message: dict, payloads: dict):
+        """按连接的格式发送消息，超时抛出 asyncio.TimeoutError；payloads 缓存已编码的结果，每种格式只编码一次"""
+        binary = websocket in self.msgpack_connections
+        payload = payloads.get(binary)
+        if payload is None:
+            payload = payloads[binary] = msgpack.packb(message) if binary else fast_json.dumps(message)
+        send = websocket.send_bytes if binary else websocket.send_text
+        await asyncio.wait_for(send(payload), WEBSOCKET_SEND_TIMEOUT)
+
+    async def send_message(self, session_id: str, message: dict, payloads: Optional[dict] = None):
+        """发送消息给会话的连接；内容固定的消息可传入共用的 payloads 复用已编码的结果"""
+        websocket = self.active_connections.get(session_id)
+        if websocket is not None:
             try:
-                await self.active_connections[session_id].send_text(json.dumps(message))
+                await self._send(websocket, message, {} if payloads is None else payloads)
             except Exception as e:
                 logger.error(f"发送WebSocket消息失败: {e}")
-                self.disconnect(session_id)
+                await self._drop(session_id, websocket)
+
+    async def publish(self, session_id: str, message: dict):
+        """
+        发送会话的处理事件：配置了共享存储时发布到该会话的频道，由持有连接的工作进程转发；
+        否则（或发布失败时）直接发送给本进程内的连接
+        """
+        store = get_session_store()
+        if store is not None:
+            try:
+                await store.publish(session_id, fast_json.dumps_bytes(message))
+                return
+            except Exception as e:
+                logger.error(f"发布会话事件失败 {session_id}: {e}")
+        await self.send_message(session_id, message)
+
+    async def _forward_events(self, store):
+        """把订阅频道收到的事件转发给本进程的连接，JSON文本帧直接复用频道中已编码的消息"""
+        try:
+            async for session_id, payload in store.listen():
+                websocket = self.active_connections.get(session_id)
+                if websocket is None:
+                    continue
+                try:
+                    await self._send(websocket, fast_json.loads(payload), {False: payload.decode("utf-8")})
+                except Exception as e:
+                    logger.error(f"发送WebSocket消息失败: {e}")
+                    await self._drop(session_id, websocket)
+        except Exception as e:
+            logger.error(f"会话事件订阅中断: {e}")
 
     async def broadcast(self, message: dict):
-        """广播消息给所有连接"""
-        for session_id in list(self.active_connections.keys()):
-            await self.send_message(session_id, message)
+        """
+        广播消息给所有连接：每种帧格式只序列化一次，每批连接并发发送，
+        批次之间让出事件循环，连接数很多时也不会长时间阻塞其他请求。
+        目前没有调用方（会话事件都经 send_message/publish 发送），保留供面向全部客户端的通知使用
+        """
+        payloads = {}
+        connections = list(self.active_connections.items())
+        for start in range(0, len(connections), BROADCAST_BATCH_SIZE):
+            batch = connections[start:start + BROADCAST_BATCH_SIZE]
+            results = await asyncio.gather(
+                *(self._send(websocket, message, payloads) for _, websocket in batch),
+                return_exceptions=True
+            )
+            for (session_id, websocket), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logger.error(f"发送WebSocket消息失败: {result}")
+                    await self._drop(session_id, websocket)
+            await asyncio.sleep(0)
 
 manager = ConnectionManager()
 
+def new_session_id() -> str:
+    """
+    生成时间有序的会话ID（UUIDv7：48位毫秒时间戳 + 74位随机数），
+    字符串按字典序即按创建时间排列，日志和会话列表中可直接按ID排序
+    """
+    if hasattr(uuid, "uuid7"):  # Python 3.14+
+        return str(uuid.uuid7())
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # 版本号 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 变体
+    return str(uuid.UUID(int=value))
+
+def api_errors(log_message: str, detail: str, include_error: bool = False):
+    """
+    接口统一的异常处理：HTTPException 原样抛出，其余异常记录日志后转为500错误
+    include_error 为 True 时在返回的错误详情后附上异常信息
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.error(f"{log_message}: {e}")
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"{detail}: {e}" if include_error else detail
+                )
+        return wrapper
+    return decorator
+
+async def get_session_or_404(session_id: str) -> Dict:
+    """路径中 session_id 对应的会话，不存在时返回404（作为接口依赖使用）
+    本进程内没有时再查共享存储，以便读取其他工作进程处理完成的会话"""
+    session = app_state.get_session(session_id)
+    if session is None:
+        store = get_session_store()
+        if store is not None:
+            try:
+                session = await store.load(session_id)
+            except Exception as e:
+                logger.warning(f"读取共享会话失败 {session_id}: {e}")
+    if session is None:
+        raise HTTPException(status_code=404, detail="会话不存在")
+    return session
+
 # API路由
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -175,94 +398,78 @@ async def root():
     """
 
 @app.get("/api/status", response_model=SystemStatus)
+@api_errors("获取系统状态失败", "无法获取系统状态")
 async def get_system_status():
     """获取系统状态"""
-    try:
-        cache_stats = await get_llm_stats()
-        performance_metrics = workflow_monitor.get_performance_report()
-        
-        return SystemStatus(
-            status="healthy",
-            active_sessions=len(app_state.active_sessions),
-            total_processed=performance_metrics["overall_metrics"]["total_runs"],
-            cache_stats=cache_stats,
-            performance_metrics=performance_metrics
-        )
-    except Exception as e:
-        logger.error(f"获取系统状态失败: {e}")
-        raise HTTPException(status_code=500, detail="无法获取系统状态")
+    cache_stats = await get_llm_stats()
+    performance_metrics = get_workflow_monitor().get_performance_report()
+    
+    return SystemStatus(
+        status="healthy",
+        active_sessions=len(app_state.active_sessions),
+        total_processed=performance_metrics["overall_metrics"]["total_runs"],
+        cache_stats=cache_stats,
+        performance_metrics=performance_metrics
+    )
 
 @app.post("/api/process", response_model=ProcessingResponse)
+@api_errors("启动文档处理失败", "处理启动失败", include_error=True)
 async def process_document(request: DocumentRequest):
     """异步处理单个文档"""
-    session_id = str(uuid.uuid4())
+    session_id = new_session_id()
     
-    try:
-        # 创建处理会话
-        app_state.active_sessions[session_id] = {
-            "request": request.dict(),
-            "status": "processing",
-            "start_time": time.time(),
-            "progress": 0.0
-        }
-        
-        # 异步处理文档
-        task = asyncio.create_task(
-            _process_document_async(session_id, request)
-        )
-        app_state.processing_tasks[session_id] = task
-        
-        return ProcessingResponse(
-            session_id=session_id,
-            status="started",
-            message="文档处理已开始",
-            progress=0.0
-        )
-        
-    except Exception as e:
-        logger.error(f"启动文档处理失败: {e}")
-        raise HTTPException(status_code=500, detail=f"处理启动失败: {str(e)}")
+    # 创建处理会话
+    app_state.add_session(session_id, {
+        "request": request.dict(),
+        "status": "processing",
+        "start_time": time.time(),
+        "progress": 0.0
+    })
+    
+    # 异步处理文档
+    task = asyncio.create_task(
+        _process_document_async(session_id, request)
+    )
+    app_state.processing_tasks[session_id] = task
+    
+    return ProcessingResponse(
+        session_id=session_id,
+        status="started",
+        message="文档处理已开始",
+        progress=0.0
+    )
 
 @app.post("/api/batch-process", response_model=ProcessingResponse)
+@api_errors("启动批量处理失败", "批量处理启动失败", include_error=True)
 async def batch_process_documents(request: BatchDocumentRequest):
     """批量处理文档"""
-    session_id = str(uuid.uuid4())
+    session_id = new_session_id()
     
-    try:
-        # 创建批处理会话
-        app_state.active_sessions[session_id] = {
-            "request": request.dict(),
-            "status": "processing",
-            "start_time": time.time(),
-            "progress": 0.0,
-            "batch_mode": True
-        }
-        
-        # 异步批量处理
-        task = asyncio.create_task(
-            _batch_process_documents_async(session_id, request)
-        )
-        app_state.processing_tasks[session_id] = task
-        
-        return ProcessingResponse(
-            session_id=session_id,
-            status="started",
-            message=f"批量处理已开始，共{len(request.documents)}个文档",
-            progress=0.0
-        )
-        
-    except Exception as e:
-        logger.error(f"启动批量处理失败: {e}")
-        raise HTTPException(status_code=500, detail=f"批量处理启动失败: {str(e)}")
+    # 创建批处理会话
+    app_state.add_session(session_id, {
+        "request": request.dict(),
+        "status": "processing",
+        "start_time": time.time(),
+        "progress": 0.0,
+        "batch_mode": True
+    })
+    
+    # 异步批量处理
+    task = asyncio.create_task(
+        _batch_process_documents_async(session_id, request)
+    )
+    app_state.processing_tasks[session_id] = task
+    
+    return ProcessingResponse(
+        session_id=session_id,
+        status="started",
+        message=f"批量处理已开始，共{len(request.documents)}个文档",
+        progress=0.0
+    )
 
 @app.get("/api/session/{session_id}", response_model=ProcessingResponse)
-async def get_session_status(session_id: str):
+async def get_session_status(session_id: str, session: Dict = Depends(get_session_or_404)):
     """获取处理会话状态"""
-    if session_id not in app_state.active_sessions:
-        raise HTTPException(status_code=404, detail="会话不存在")
-    
-    session = app_state.active_sessions[session_id]
-    
     return ProcessingResponse(
         session_id=session_id,
         status=session["status"],
@@ -272,6 +479,50 @@ async def get_session_status(session_id: str):
         error=session.get("error")
     )
 
+# 下载时各文档格式对应的媒体类型和扩展名
+_DOWNLOAD_TYPES = {
+    "html": ("text/html; charset=utf-8", "html"),
+    "markdown": ("text/markdown; charset=utf-8", "md")
+}
+
+@app.get("/api/session/{session_id}/download")
+async def download_session_document(
+    session: Dict = Depends(get_session_or_404),
+    export_format: Optional[str] = Query(None, alias="format")
+):
+    """下载会话生成的最终文档；指定 format（如 pdf、docx）时先转换为该格式再下载"""
+    final_document = (session.get("result") or {}).get("final_document") or {}
+    content = final_document.get("content")
+    if not content:
+        raise HTTPException(status_code=404, detail="文档尚未生成")
+    
+    if export_format:
+        # 转换器直接写出到文件，响应从磁盘分块发送，发送完成后删除，不在内存中保留整份导出文件
+        result = await asyncio.get_running_loop().run_in_executor(
+            None, convert_document, content, export_format
+        )
+        if not result.get("success"):
+            raise HTTPException(status_code=400, detail=result.get("error", "导出失败"))
+        file_path = result["file_path"]
+        # 已设置 Content-Encoding 的响应 GZipMiddleware 不再压缩：PDF/DOCX/PPTX 本身已是压缩格式，
+        # 原样从文件发送，不浪费CPU重复压缩
+        return FileResponse(
+            file_path,
+            filename=f"processed_document{Path(file_path).suffix}",
+            headers={"Content-Encoding": "identity"},
+            background=BackgroundTask(os.unlink, file_path)
+        )
+    
+    doc_format = final_document.get("format", "HTML").lower()
+    media_type, extension = _DOWNLOAD_TYPES.get(doc_format, ("text/plain; charset=utf-8", doc_format))
+    
+    # 文档只保存在内存中：编码后作为单个响应体一次写出（带 Content-Length），不走分块的流式响应
+    return Response(
+        content=content.encode("utf-8"),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="processed_document.{extension}"'}
+    )
+
 @app.delete("/api/session/{session_id}")
 async def cancel_session(session_id: str):
     """取消处理会话"""
@@ -286,102 +537,110 @@ async def cancel_session(session_id: str):
     return {"message": "会话已取消"}
 
 @app.post("/api/clear-cache")
+@api_errors("清空缓存失败", "清空缓存失败")
 async def clear_system_cache():
     """清空系统缓存"""
-    try:
-        await clear_llm_cache()
-        return {"message": "缓存已清空"}
-    except Exception as e:
-        logger.error(f"清空缓存失败: {e}")
-        raise HTTPException(status_code=500, detail="清空缓存失败")
+    await clear_llm_cache()
+    return {"message": "缓存已清空"}
 
 @app.post("/api/upload")
+@api_errors("文件上传失败", "文件上传失败")
 async def upload_file(file: UploadFile = File(...)):
     """上传文件"""
     if not file.filename.endswith(('.md', '.txt', '.markdown')):
         raise HTTPException(status_code=400, detail="只支持Markdown和文本文件")
     
-    try:
-        content = await file.read()
-        content_str = content.decode('utf-8')
-        
-        # 确定文件类型
-        file_type = "markdown" if file.filename.endswith(('.md', '.markdown')) else "text"
-        
-        return {
-            "filename": file.filename,
-            "content": content_str,
-            "file_type": file_type,
-            "size": len(content)
-        }
-        
-    except Exception as e:
-        logger.error(f"文件上传失败: {e}")
-        raise HTTPException(status_code=500, detail="文件上传失败")
+    # 分块读取并增量解码：超过上限立即拒绝，不必先把整个文件读入内存；
+    # 内存中只保留解码后的文本，不再同时持有完整的原始字节
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    parts = []
+    size = 0
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > MAX_UPLOAD_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"文件超过大小上限 {MAX_UPLOAD_BYTES // (1024 * 1024)}MB"
+            )
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b'', final=True))
+    content_str = ''.join(parts)
+    
+    # 确定文件类型
+    file_type = "markdown" if file.filename.endswith(('.md', '.markdown')) else "text"
+    
+    return {
+        "filename": file.filename,
+        "content": content_str,
+        "file_type": file_type,
+        "size": size
+    }
+
+# 模板列表是常量，响应体在导入时序列化一次，请求时直接返回
+_TEMPLATES = [
+    {
+        "id": "business",
+        "name": "商务报告",
+        "description": "专业的商务报告格式，适合企业使用",
+        "preview": "modern_business_style.jpg",
+        "category": "business"
+    },
+    {
+        "id": "academic",
+        "name": "学术论文",
+        "description": "标准的学术论文格式，符合期刊要求",
+        "preview": "academic_paper_style.jpg",
+        "category": "academic"
+    },
+    {
+        "id": "creative",
+        "name": "创意设计",
+        "description": "充满创意的设计风格，适合展示创意作品",
+        "preview": "creative_design_style.jpg",
+        "category": "creative"
+    },
+    {
+        "id": "technical",
+        "name": "技术文档",
+        "description": "清晰的技术文档格式，便于阅读和理解",
+        "preview": "technical_doc_style.jpg",
+        "category": "technical"
+    },
+    {
+        "id": "presentation",
+        "name": "产品展示",
+        "description": "友好的产品说明格式，突出产品特色",
+        "preview": "product_presentation_style.jpg",
+        "category": "marketing"
+    }
+]
+_TEMPLATES_RESPONSE_BODY = fast_json.dumps_bytes({"templates": _TEMPLATES})
 
 @app.get("/api/templates")
 async def get_templates():
     """获取可用模板"""
-    templates = [
-        {
-            "id": "business",
-            "name": "商务报告",
-            "description": "专业的商务报告格式，适合企业使用",
-            "preview": "modern_business_style.jpg",
-            "category": "business"
-        },
-        {
-            "id": "academic",
-            "name": "学术论文",
-            "description": "标准的学术论文格式，符合期刊要求",
-            "preview": "academic_paper_style.jpg",
-            "category": "academic"
-        },
-        {
-            "id": "creative",
-            "name": "创意设计",
-            "description": "充满创意的设计风格，适合展示创意作品",
-            "preview": "creative_design_style.jpg",
-            "category": "creative"
-        },
-        {
-            "id": "technical",
-            "name": "技术文档",
-            "description": "清晰的技术文档格式，便于阅读和理解",
-            "preview": "technical_doc_style.jpg",
-            "category": "technical"
-        },
-        {
-            "id": "presentation",
-            "name": "产品展示",
-            "description": "友好的产品说明格式，突出产品特色",
-            "preview": "product_presentation_style.jpg",
-            "category": "marketing"
-        }
-    ]
-    
-    return {"templates": templates}
+    return Response(content=_TEMPLATES_RESPONSE_BODY, media_type="application/json")
 
 # WebSocket路由
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     """WebSocket实时通信端点"""
-    await manager.connect(websocket, session_id)
+    if not await manager.connect(websocket, session_id):
+        return
     
     try:
         while True:
             # 接收客户端消息
-            data = await websocket.receive_text()
-            message = json.loads(data)
+            message = await manager.receive_message(websocket)
             
             # 处理不同类型的消息
             if message["type"] == "ping":
-                await manager.send_message(session_id, {"type": "pong"})
+                await manager.send_message(session_id, _PONG_MESSAGE, _PONG_PAYLOADS)
             
             elif message["type"] == "get_progress":
                 # 发送当前进度
-                if session_id in app_state.active_sessions:
-                    session = app_state.active_sessions[session_id]
+                session = app_state.get_session(session_id)
+                if session is not None:
                     await manager.send_message(session_id, {
                         "type": "progress_update",
                         "progress": session.get("progress", 0.0),
@@ -398,10 +657,10 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 })
                 
     except WebSocketDisconnect:
-        manager.disconnect(session_id)
+        await manager.disconnect(session_id, websocket)
     except Exception as e:
         logger.error(f"WebSocket错误: {e}")
-        manager.disconnect(session_id)
+        await manager.disconnect(session_id, websocket)
 
 # 内部处理函数
 async def _process_document_async(session_id: str, request: DocumentRequest):
@@ -431,7 +690,7 @@ async def _process_document_async(session_id: str, request: DocumentRequest):
         await _update_session_progress(session_id, 20, "开始文档处理...")
         
         # 监控并运行工作流
-        await workflow_monitor.monitor_flow_execution(flow, shared_data)
+        await get_workflow_monitor().monitor_flow_execution(flow, shared_data)
         
         # 更新进度
         await _update_session_progress(session_id, 90, "生成最终结果...")
@@ -448,9 +707,10 @@ async def _process_document_async(session_id: str, request: DocumentRequest):
         session["status"] = "completed"
         session["progress"] = 100.0
         session["message"] = "文档处理完成"
+        await _persist_session(session_id)
         
         # 通过WebSocket发送完成通知
-        await manager.send_message(session_id, {
+        await manager.publish(session_id, {
             "type": "processing_completed",
             "result": result,
             "message": "文档处理完成"
@@ -462,9 +722,10 @@ async def _process_document_async(session_id: str, request: DocumentRequest):
         session["status"] = "failed"
         session["error"] = str(e)
         session["message"] = f"处理失败: {str(e)}"
+        await _persist_session(session_id)
         
         # 通过WebSocket发送错误通知
-        await manager.send_message(session_id, {
+        await manager.publish(session_id, {
             "type": "processing_failed",
             "error": str(e),
             "message": f"处理失败: {str(e)}"
@@ -508,9 +769,10 @@ async def _batch_process_documents_async(session_id: str, request: BatchDocument
         session["status"] = "completed"
         session["progress"] = 100.0
         session["message"] = "批量处理完成"
+        await _persist_session(session_id)
         
         # 通过WebSocket发送完成通知
-        await manager.send_message(session_id, {
+        await manager.publish(session_id, {
             "type": "batch_processing_completed",
             "result": result,
             "message": "批量处理完成"
@@ -522,9 +784,10 @@ async def _batch_process_documents_async(session_id: str, request: BatchDocument
         session["status"] = "failed"
         session["error"] = str(e)
         session["message"] = f"批量处理失败: {str(e)}"
+        await _persist_session(session_id)
         
         # 通过WebSocket发送错误通知
-        await manager.send_message(session_id, {
+        await manager.publish(session_id, {
             "type": "batch_processing_failed",
             "error": str(e),
             "message": f"批量处理失败: {str(e)}"
@@ -538,12 +801,23 @@ async def _update_session_progress(session_id: str, progress: float, message: st
         session["message"] = message
         
         # 通过WebSocket发送进度更新
-        await manager.send_message(session_id, {
+        await manager.publish(session_id, {
             "type": "progress_update",
             "progress": progress,
             "message": message
         })
 
+async def _persist_session(session_id: str):
+    """将已结束的会话写入共享存储（未配置时跳过），写入失败不影响本进程内的结果"""
+    store = get_session_store()
+    session = app_state.active_sessions.get(session_id)
+    if store is None or session is None:
+        return
+    try:
+        await store.save(session_id, session)
+    except Exception as e:
+        logger.warning(f"写入共享会话失败 {session_id}: {e}")
+
 # 定期清理任务
 @app.on_event("startup")
 async def startup_event():
@@ -553,6 +827,13 @@ async def startup_event():
     # 启动定期清理任务
     asyncio.create_task(cleanup_expired_sessions())
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时释放共享存储连接"""
+    store = get_session_store()
+    if store is not None:
+        await store.close()
+
 async def cleanup_expired_sessions():
     """定期清理过期会话"""
     while True: